@@ -0,0 +1,380 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+capture -- module for raw measurement captures in a compact binary format
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+A capture file is a 16 byte header followed by fixed 16 byte records:
+
+  header: 8 byte magic "WLCAPTUR", little endian uint32 version and
+          uint32 record size
+  record: little endian int64 tick in ns since the epoch, int32 air pressure
+          in Pascals and int32 water column pressure in Pascals
+
+The records are read through numpy.memmap, so replaying a capture does not
+copy the pressures at all. Only the ticks are converted to seconds a block
+at a time.
+
+To convert a recorded text file:
+  python capture.py <inputFileName.csv> <captureFileName>
+"""
+
+
+#### IMPORTS ####
+
+import os
+import struct
+import sys
+
+import numpy as np
+
+import csvreader
+from config import CAPTURE_BLOCK_SIZE
+
+
+#### CONSTANTS ####
+
+CAPTURE_MAGIC = "WLCAPTUR"
+CAPTURE_VERSION = 1
+CAPTURE_DTYPE = np.dtype([('tick', '<i8'),
+                          ('airPressure', '<i4'),
+                          ('waterColumnPressure', '<i4')])
+HEADER = CAPTURE_MAGIC + struct.pack( '<II', CAPTURE_VERSION,
+                                      CAPTURE_DTYPE.itemsize)
+NS_PER_SECOND = 10**9
+
+
+#### CLASSES ####
+
+class CaptureRecorder (object):
+  """write measurements to a capture file
+
+  attributes:
+    outFile: file object of the capture file being written
+  """
+
+  def __init__ (self, fileName):
+    """Open a capture file for appending, writing the header if it is new.
+
+    Args:
+      fileName: (str) name of the capture file
+
+    Returns:
+      None
+
+    Raises:
+      IOError if the file cannot be opened or is not a capture file
+    """
+    if os.path.exists( fileName) and os.path.getsize( fileName) > 0:
+      if not isCapture( fileName):
+        raise IOError( fileName + " is not a capture file")
+      self.outFile = open( fileName, 'r+b')
+      # drop a partly written last record before appending
+      self.outFile.truncate( len( HEADER) + captureLength( fileName) *
+                             CAPTURE_DTYPE.itemsize)
+      self.outFile.seek( 0, os.SEEK_END)
+    else:
+      self.outFile = open( fileName, 'wb')
+      self.outFile.write( HEADER)
+
+
+  def record (self, tick, airPressure, waterColumnPressure):
+    """Append one measurement to the capture file.
+
+    Args:
+      tick: (float) epoch time of the measurement in s
+      airPressure: (int) air pressure in Pascals
+      waterColumnPressure: (int) water column pressure in Pascals
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    seconds = int( tick // 1)
+    self.outFile.write( struct.pack(
+      '<qii', seconds * NS_PER_SECOND + int( round(( tick - seconds) *
+                                                    NS_PER_SECOND)),
+      airPressure, waterColumnPressure))
+
+
+  def recordBlock (self, ticks, airPressures, waterColumnPressures):
+    """Append a block of measurements to the capture file.
+
+    Args:
+      ticks: (float array) epoch times of the measurements in s
+      airPressures: (int array) air pressures in Pascals
+      waterColumnPressures: (int array) water column pressures in Pascals
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    records = np.empty( len( ticks), dtype=CAPTURE_DTYPE)
+    records['tick'] = ticksToNs( ticks)
+    records['airPressure'] = airPressures
+    records['waterColumnPressure'] = waterColumnPressures
+    self.outFile.write( records.tostring())
+
+
+  def close (self):
+    """close the capture file."""
+    self.outFile.close()
+
+
+
+class RecordReader (object):
+  """read an array of measurement records a block at a time without copying
+
+  The records have tick, airPressure and waterColumnPressure fields. Integer
+  ticks are in ns and are converted to s, float ticks are already in s.
+
+  attributes:
+    records: array of records, normally memory mapped
+    blockSize: (int) number of records returned by each readBlock()
+  """
+
+  def __init__ (self, records, blockSize=CAPTURE_BLOCK_SIZE):
+    """Initialize a reader on an array of records.
+
+    Args:
+      records: array of records
+      blockSize: (int) optional number of records in each block
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.records = records
+    self.blockSize = blockSize
+    self.position = 0
+
+
+  def readBlock (self):
+    """Get the next block of measurements.
+
+    Args:
+      None
+
+    Returns:
+      (ticks, airPressures, waterColumnPressures) arrays, the pressures are
+      views into the records, or None at end of the records
+
+    Raises:
+      None
+    """
+    if self.position >= len( self.records):
+      return None
+    block = self.records[ self.position:self.position + self.blockSize]
+    self.position = self.position + len( block)
+    ticks = block['tick']
+    if ticks.dtype.kind == 'i':
+      ticks = nsToTicks( ticks)
+    return ticks, block['airPressure'], block['waterColumnPressure']
+
+
+  def seek (self, tick):
+    """Move to the first measurement at or after a time.
+
+    Args:
+      tick: (float) epoch time in s
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    ticks = self.records['tick']
+    if ticks.dtype.kind == 'i':
+      tick = ticksToNs( np.array([ tick]))[0]
+    self.position = int( np.searchsorted( ticks, tick, side='left'))
+
+
+  def close (self):
+    """release the records.
+
+    An empty slice would still be a view on a memory mapped file, so the
+    records are replaced by a new empty array instead. The file is unmapped
+    once no blocks read from it are left either.
+    """
+    self.records = np.empty( 0, dtype=self.records.dtype)
+
+
+
+class CaptureReader (RecordReader):
+  """read a capture file a block at a time without copying it"""
+
+  def __init__ (self, fileName, blockSize=CAPTURE_BLOCK_SIZE):
+    """Map a capture file for reading.
+
+    Args:
+      fileName: (str) name of the capture file
+      blockSize: (int) optional number of records in each block
+
+    Returns:
+      None
+
+    Raises:
+      IOError if the file cannot be opened or is not a capture file
+    """
+    RecordReader.__init__( self, openCapture( fileName), blockSize)
+
+
+#### FUNCTIONS ####
+
+def isCapture (fileName):
+  """Check whether a file starts with the capture file header
+
+  Args:
+    fileName: (str) name of the file
+
+  Returns:
+    True if the file is a capture file, False otherwise
+
+  Raises:
+    None
+  """
+  try:
+    with open( fileName, 'rb') as inFile:
+      return inFile.read( len( HEADER)) == HEADER
+  except IOError:
+    return False
+
+
+def openCapture (fileName):
+  """Map the records of a capture file into memory
+
+  Args:
+    fileName: (str) name of the capture file
+
+  Returns:
+    read only array of CAPTURE_DTYPE records
+
+  Raises:
+    IOError if the file cannot be opened or is not a capture file
+  """
+  if not isCapture( fileName):
+    raise IOError( fileName + " is not a capture file")
+  count = captureLength( fileName)
+  if count == 0:
+    return np.empty( 0, dtype=CAPTURE_DTYPE)
+  return np.memmap( fileName, dtype=CAPTURE_DTYPE, mode='r',
+                    offset=len( HEADER), shape=(count,))
+
+
+def captureLength (fileName):
+  """Count the whole records in a capture file
+
+  A partly written last record is not counted.
+
+  Args:
+    fileName: (str) name of the capture file
+
+  Returns:
+    (int) number of records
+
+  Raises:
+    OSError if the file does not exist
+  """
+  return max( 0, os.path.getsize( fileName) - len( HEADER)) // \
+      CAPTURE_DTYPE.itemsize
+
+
+def ticksToNs (ticks):
+  """convert epoch times in s to integer ns
+
+  Args:
+    ticks: (float array) epoch times in s
+
+  Returns:
+    (int64 array) epoch times in ns
+
+  Raises:
+    None
+  """
+  seconds = np.floor( ticks)
+  return seconds.astype( np.int64) * NS_PER_SECOND + \
+      np.round(( ticks - seconds) * NS_PER_SECOND).astype( np.int64)
+
+
+def nsToTicks (ns):
+  """convert integer ns to epoch times in s
+
+  Args:
+    ns: (int64 array) epoch times in ns
+
+  Returns:
+    (float array) epoch times in s
+
+  Raises:
+    None
+  """
+  return ( ns // NS_PER_SECOND).astype( np.float64) + \
+      ( ns % NS_PER_SECOND) / float( NS_PER_SECOND)
+
+
+def convertCsvToCapture (csvFileName, captureFileName):
+  """Convert a recorded text file into a capture file
+
+  Lines that cannot be parsed are skipped, just as they are on replay.
+
+  Args:
+    csvFileName: (str) name of the recorded text file
+    captureFileName: (str) name of the capture file to be written
+
+  Returns:
+    (int) number of measurements converted
+
+  Raises:
+    IOError if either file cannot be opened
+  """
+  reader = csvreader.CsvReader( open( csvFileName, 'r'))
+  recorder = CaptureRecorder( captureFileName)
+  count = 0
+  while True:
+    block = reader.readBlock()
+    if block is None:
+      break
+    recorder.recordBlock( *block)
+    count = count + len( block[0])
+  reader.close()
+  recorder.close()
+  return count
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  if len( sys.argv) != 3:
+    print 'try: ', sys.argv[0] + ' <inputFileName.csv> <captureFileName>'
+    sys.exit(2)
+  print "Converted", convertCsvToCapture( sys.argv[1], sys.argv[2]), \
+      "measurements"
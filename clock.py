@@ -0,0 +1,184 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+clock -- module for the time seen by the rest of the program
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+Everything that needs the current time or a date for a tick asks a clock,
+so the same code runs live and on replays. There are three modes:
+
+  LIVE_CLOCK   now() is the wall clock, for the sensors
+  FAST_CLOCK   now() is the tick of the latest measurement, replayed as
+               fast as the measurements can be processed
+  PACED_CLOCK  like FAST_CLOCK, but advance() waits so that the ticks go by
+               at speed times the wall clock, e.g. 60 replays an hour a minute
+
+In the replay modes the main loop calls advance() with each measurement tick.
+"""
+
+
+#### IMPORTS ####
+
+import datetime
+import time
+
+
+#### CONSTANTS ####
+
+LIVE_CLOCK = "live"
+FAST_CLOCK = "fast"
+PACED_CLOCK = "paced"
+PACING_SLACK = .01 # s ahead of the wall clock before waiting
+
+
+#### CLASSES ####
+
+class Clock (object):
+  """a clock for live measurements or for replays
+
+  attributes:
+    mode: LIVE_CLOCK, FAST_CLOCK or PACED_CLOCK
+    speed: (float) ticks per wall clock s for PACED_CLOCK
+    tick: (float) epoch in s of the latest measurement, None before any
+  """
+
+  def __init__ (self, mode=LIVE_CLOCK, speed=1.):
+    """Initialize a clock.
+
+    Args:
+      mode: optional LIVE_CLOCK, FAST_CLOCK or PACED_CLOCK
+      speed: (float) optional ticks per wall clock s for PACED_CLOCK
+
+    Returns:
+      None
+
+    Raises:
+      ValueError if the mode is unknown or the speed is not positive
+    """
+    if mode not in ( LIVE_CLOCK, FAST_CLOCK, PACED_CLOCK):
+      raise ValueError( "Unknown clock mode " + str( mode))
+    if speed <= 0:
+      raise ValueError( "Clock speed must be positive")
+    self.mode = mode
+    self.speed = float( speed)
+    self.tick = None
+    self._startTick = None
+    self._startWallTime = None
+
+
+  def now (self):
+    """Get the current time.
+
+    Args:
+      None
+
+    Returns:
+      (float) epoch in s, the wall clock when live, otherwise the tick of
+      the latest measurement
+
+    Raises:
+      None
+    """
+    if self.mode == LIVE_CLOCK or self.tick is None:
+      return time.time()
+    return self.tick
+
+
+  def advance (self, tick):
+    """Move the clock to the tick of the latest measurement.
+
+    For PACED_CLOCK this waits until it is time for the tick.
+
+    Args:
+      tick: (float) epoch in s of the measurement
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.tick = tick
+    if self.mode != PACED_CLOCK:
+      return
+    wallTime = time.time()
+    if self._startTick is None:
+      self._startTick = tick
+      self._startWallTime = wallTime
+      return
+    ahead = self._startWallTime + ( tick - self._startTick) / self.speed - \
+        wallTime
+    if ahead > PACING_SLACK:
+      time.sleep( ahead)
+
+
+  def datetime (self, tick=None):
+    """Get the local date and time of a tick.
+
+    Args:
+      tick: (float) optional epoch in s, now() if not given
+
+    Returns:
+      datetime.datetime object
+
+    Raises:
+      None
+    """
+    if tick is None:
+      tick = self.now()
+    return datetime.datetime.fromtimestamp( float( tick))
+
+
+#### FUNCTIONS ####
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  replayClock = Clock( PACED_CLOCK, 60)
+  start = time.time()
+  for second in range( 0, 61, 6): # a minute of ticks in about a second
+    replayClock.advance( 1533571200 + second)
+  print "Paced a minute in {0:.2f} s, now {1:%H:%M:%S}".format(
+    time.time() - start, replayClock.datetime())
+
+  replayClock = Clock( FAST_CLOCK)
+  replayClock.advance( 1533571200)
+  print "Fast clock now", replayClock.now()
+  print "Live clock now", Clock().now()
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
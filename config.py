@@ -46,11 +46,19 @@ INFLUXDB_POLICY = "INF"
 
 MAX_LIST = 10 # maximum number of list items for pretty printing
 
-# constants for random data generation
+# constants for synthetic data generation
 BASE_AIR_PRESSURE = 99600
-SWING_AIR_PRESSURE = 100
+SWING_AIR_PRESSURE = 100 # Pa, peak to peak drift of the air pressure
 BASE_WATER_COLUMN_PRESSURE = 110000
-SWING_WATER_COLUMN_PRESSURE = 1000
+SYNTHETIC_SEED = 1 # same seed, same measurements and wakes
+SYNTHETIC_START_TICK = 1533571200 # 2018-08-06 16:00 UTC
+SYNTHETIC_BLOCK_SIZE = 2**12 # measurements generated at a time
+SWELL_PERIODS = [2.5, 3.3, 4.1] # s, background swell components
+SWELL_HEIGHT = 1.0 # inches, peak to peak height of each swell component
+WAKE_INTERVAL = 5 * 60 # s, average time between boat wakes
+WAKE_HEIGHTS = (2., 8.) # inches, range of peak to peak wake heights
+WAKE_CYCLES = 6 # number of waves in a wake
+SENSOR_NOISE = 3 # Pa, standard deviation of the sensor noise
 
 PA_TO_INCH = 248.84 # Pa/inchH20 at 60?F
 WATER_COLUMN_OFFSET = 12 # inches, resistance of tubing and height correction
@@ -104,6 +112,14 @@ CSV_FORMAT = "{year:d}-{month:d}-{day:d} {hour:d}:{minute:d}:{second:f}, " +\
 #CSV_FORMAT = "{year:d}.{month:d}.{day:d}_{hour:d}.{minute:d}.{second:f},
 #    {airPressure:d}, {waterColumnPressure:d}\n"
 ##CSV_FORMAT = "{date:S} {time:S}, {airPressure:S}, {waterColumnPressure:S}\n"
+CSV_BLOCK_SIZE = 2**20 # bytes of a recorded file parsed at a time
+CAPTURE_BLOCK_SIZE = 2**16 # records of a binary capture file read at a time
+COMPRESSED_BUFFER_SIZE = 2**20 # bytes buffered when decompressing a file
+PARALLEL_RANGE_SIZE = 2**24 # bytes of a recorded file parsed by a worker
+INDEX_STRIDE = 2**18 # bytes of a recorded file between time index entries
+CACHE_REPLAYS = True # keep parsed recorded files in the cache directory
+CACHE_DIRECTORY = "~/.cache/water-level" # where parsed files are kept
+CACHE_LIMIT = 4 * 2**30 # bytes, least recently used cache files are removed
 
 
 # raw wave print formats
@@ -127,6 +143,7 @@ PLOT_MODE = PLOT_SUMMARY
 SEND_RAW_MEASUREMENTS = False # send raw measurement and associated statistics
 SEND_RAW_WAVES = False # send raw waves
 SEND_START_RESPONSES = False # include the spectrum where responses are timed
+SEND_SPECTROGRAM = False # send every bin of each spectrogram frame
                              # to the start of the sample with the frequency
                              # response.
                              # The current normal is the time is at the end of
@@ -141,8 +158,8 @@ PEAK_THRESHOLD = 0. # inches
 WAVE_PERIOD_THRESHOLD = 0 # seconds
 WAVE_PERIOD_CUTOFF = 100 # seconds
 
-NUM_CANDIDATES = 6 # number of candidates in dominant wave pool
 DOMINANT_WAVE_PERIOD = 10 * 60 # 10 minutes in seconds
+DOMINANT_WAVE_HORIZONS = [60, 60 * 60, 24 * 60 * 60] # s, also reported
 
 
 #cluster configuration
@@ -173,10 +190,33 @@ RESOLUTION = 7 # number of bits resolution for frequency samples
 CLOSEST_METHOD = 1
 INTERPOLATION_METHOD = 2
 NORMALIZATION_METHOD = INTERPOLATION_METHOD 
+GAP_THRESHOLD = 1. # s between measurements that starts a new grid segment
+INPUT_BLOCK_SIZE = SAMPLES_PER_SECOND # measurements regridded at a time
 
 # spectra configuration
 MINIMUM_NUMBER_OF_CYCLES = 3 # minimum number of cycle periods in an FFT sample
 BUFFER_SIZE =  2**10 # or about 30 seconds at 30 samples/second
+FFT_ENGINE = 1 # full FFT of the sample buffer every time
+SLIDING_DFT_ENGINE = 2 # the one bin of interest updated with each resample
+RESPONSE_ENGINE = FFT_ENGINE
+SLIDING_DFT_REFRESH = 2**12 # resamples between exact sums against drift
+RESAMPLE_DTYPE = "float64" # or "float32" for half the resample memory
+RESAMPLE_SPECTRUM = 1 # each wave length and period resampled on its own
+SHARED_SPECTRUM = 2 # all responses from one shared decimated history
+MULTIRATE_SPECTRUM = 3 # responses from the nearest of octave spaced streams
+ZOOM_SPECTRUM = 4 # responses from a chirp-z of one shared history
+SPECTRUM_ENGINE = RESAMPLE_SPECTRUM
+SPECTRUM_DECIMATION = 4 # wave heights averaged into each shared history value
+MULTIRATE_SAMPLES_PER_CYCLE = 8 # fewest octave values per cycle of a band
+ZOOM_POINTS = 200 # frequencies in the chirp-z grid spanning the bands
+QUADRATIC_PEAK = 1 # parabola through the three largest responses
+GAUSSIAN_PEAK = 2 # parabola through their logs
+PEAK_INTERPOLATION = GAUSSIAN_PEAK
+SPECTROGRAM = False # keep a spectrogram of the wave heights
+SPECTROGRAM_DECIMATION = 8 # wave heights averaged into each spectrogram value
+SPECTROGRAM_FRAME_SIZE = 2**9 # values in a frame, about 137 s
+SPECTROGRAM_HOP = 2**6 # values between frames, about 17 s
+SPECTROGRAM_FRAMES_KEPT = 16 # latest frames kept for whoever wants them
 '''
 Notes
 
@@ -0,0 +1,218 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+csvcache -- module for caching parsed recorded files between replays
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+The first time a recorded file is replayed from start to end, the parsed
+ticks and pressures are written to a cache file in CACHE_DIRECTORY. Later
+replays map the cache file into memory instead of parsing the text again.
+
+A cache file is named for the path, size and modification time of the
+recorded file and for CSV_FORMAT, so changing any of them makes a new cache
+file. The records hold the tick as a float in s, so the replayed ticks are
+exactly the parsed ticks.
+
+Using a cache file touches its modification time. When the cache files add up
+to more than CACHE_LIMIT bytes, the least recently used ones are removed.
+"""
+
+
+#### IMPORTS ####
+
+import hashlib
+import os
+
+import numpy as np
+
+from config import CSV_FORMAT
+from config import CACHE_DIRECTORY
+from config import CACHE_LIMIT
+
+
+#### CONSTANTS ####
+
+CACHE_VERSION = 1
+CACHE_DTYPE = np.dtype([('tick', '<f8'),
+                        ('airPressure', '<i4'),
+                        ('waterColumnPressure', '<i4')])
+CACHE_SUFFIX = ".rec"
+PARTIAL_SUFFIX = ".partial"
+
+
+#### CLASSES ####
+
+class CacheWriter (object):
+  """write the parsed blocks of a recorded file to a new cache file
+
+  The cache file only becomes visible when commit() is called after the
+  whole recorded file has been read.
+
+  attributes:
+    cacheFileName: (str) name of the finished cache file
+    outFile: file object of the partial cache file
+  """
+
+  def __init__ (self, fileName):
+    """Start a cache file for a recorded file.
+
+    Args:
+      fileName: (str) name of the recorded file
+
+    Returns:
+      None
+
+    Raises:
+      IOError or OSError if the cache file cannot be created
+    """
+    directory = os.path.expanduser( CACHE_DIRECTORY)
+    if not os.path.isdir( directory):
+      os.makedirs( directory)
+    self.cacheFileName = cacheFileName( fileName)
+    self.outFile = open( self.cacheFileName + PARTIAL_SUFFIX, 'wb')
+
+
+  def recordBlock (self, ticks, airPressures, waterColumnPressures):
+    """Add a parsed block to the cache file.
+
+    Args:
+      ticks: (float array) epoch times of the measurements in s
+      airPressures: (int array) air pressures in Pascals
+      waterColumnPressures: (int array) water column pressures in Pascals
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    records = np.empty( len( ticks), dtype=CACHE_DTYPE)
+    records['tick'] = ticks
+    records['airPressure'] = airPressures
+    records['waterColumnPressure'] = waterColumnPressures
+    self.outFile.write( records.tostring())
+
+
+  def commit (self):
+    """Finish the cache file and make room for it in the cache directory.
+
+    Args:
+      None
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.outFile.close()
+    os.rename( self.cacheFileName + PARTIAL_SUFFIX, self.cacheFileName)
+    evict()
+
+
+  def abandon (self):
+    """Throw away an unfinished cache file."""
+    self.outFile.close()
+    try:
+      os.remove( self.cacheFileName + PARTIAL_SUFFIX)
+    except OSError:
+      pass
+
+
+#### FUNCTIONS ####
+
+def cacheFileName (fileName):
+  """Determine the name of the cache file for a recorded file
+
+  Args:
+    fileName: (str) name of the recorded file
+
+  Returns:
+    (str) name of the cache file
+
+  Raises:
+    OSError if the recorded file does not exist
+  """
+  status = os.stat( fileName)
+  key = "{0}|{1}|{2!r}|{3}|{4}".format( os.path.realpath( fileName),
+                                        status.st_size, status.st_mtime,
+                                        CSV_FORMAT, CACHE_VERSION)
+  return os.path.join( os.path.expanduser( CACHE_DIRECTORY),
+                       hashlib.sha1( key).hexdigest() + CACHE_SUFFIX)
+
+
+def openCache (fileName):
+  """Map the cache file of a recorded file into memory, if there is one
+
+  Args:
+    fileName: (str) name of the recorded file
+
+  Returns:
+    read only array of CACHE_DTYPE records, or None if there is no cache file
+
+  Raises:
+    None
+  """
+  try:
+    name = cacheFileName( fileName)
+    count = os.path.getsize( name) // CACHE_DTYPE.itemsize
+    os.utime( name, None) # recently used
+  except OSError:
+    return None
+  if count == 0:
+    return np.empty( 0, dtype=CACHE_DTYPE)
+  return np.memmap( name, dtype=CACHE_DTYPE, mode='r', shape=(count,))
+
+
+def evict (limit=CACHE_LIMIT):
+  """Remove the least recently used cache files until they fit in the limit
+
+  Args:
+    limit: (int) optional number of bytes allowed for all cache files
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  directory = os.path.expanduser( CACHE_DIRECTORY)
+  try:
+    names = [os.path.join( directory, name) for name in os.listdir( directory)
+             if name.endswith( CACHE_SUFFIX)]
+    entries = sorted([( os.path.getmtime( name), os.path.getsize( name), name)
+                      for name in names])
+  except OSError:
+    return
+  total = sum([size for _, size, _ in entries])
+  for _, size, name in entries:
+    if total <= limit:
+      break
+    try:
+      os.remove( name)
+      total = total - size
+    except OSError:
+      pass
@@ -0,0 +1,119 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+csvindex -- module for finding times in large recorded files
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+An index is a sparse list of (tick, byte offset) pairs, one for about every
+INDEX_STRIDE bytes of a recorded file. It is built by seeking to each stride
+and reading only the first line that parses there, so building it does not
+read the whole file.
+
+The index is saved beside the recorded file with INDEX_SUFFIX added to the
+name and is rebuilt whenever the recorded file is newer than it. If the
+directory is not writable the index is just kept in memory.
+
+The recorded file is assumed to be in time order.
+"""
+
+
+#### IMPORTS ####
+
+import os
+
+import numpy as np
+
+import csvreader
+from config import INDEX_STRIDE
+
+
+#### CONSTANTS ####
+
+INDEX_SUFFIX = ".idx"
+INDEX_DTYPE = np.dtype([('tick', '<f8'), ('offset', '<i8')])
+MAXIMUM_PROBE_LINES = 100 # lines tried at a stride before giving up on it
+
+
+#### FUNCTIONS ####
+
+def buildIndex (fileName, stride=INDEX_STRIDE):
+  """Build the time index of a recorded file
+
+  Args:
+    fileName: (str) name of the recorded file
+    stride: (int) optional approximate number of bytes between entries
+
+  Returns:
+    array of INDEX_DTYPE entries in file order
+
+  Raises:
+    IOError if the file cannot be read
+  """
+  entries = []
+  with open( fileName, 'rb') as inFile:
+    for offset in xrange( 0, os.path.getsize( fileName), stride):
+      inFile.seek( offset)
+      if offset > 0:
+        inFile.readline() # skip the partial line
+      for _ in xrange( MAXIMUM_PROBE_LINES):
+        position = inFile.tell()
+        line = inFile.readline()
+        if not line:
+          break
+        ticks = csvreader.parseCsvBlock( line)[0]
+        if len( ticks) > 0:
+          if not entries or position > entries[-1][1]:
+            entries.append(( ticks[0], position))
+          break
+  return np.array( entries, dtype=INDEX_DTYPE)
+
+
+def loadIndex (fileName):
+  """Get the time index of a recorded file, building it if necessary
+
+  Args:
+    fileName: (str) name of the recorded file
+
+  Returns:
+    array of INDEX_DTYPE entries in file order
+
+  Raises:
+    IOError if the file cannot be read
+  """
+  indexFileName = fileName + INDEX_SUFFIX
+  try:
+    if os.path.getmtime( indexFileName) >= os.path.getmtime( fileName):
+      return np.load( indexFileName)
+  except (IOError, OSError, ValueError):
+    pass # missing or unreadable, build a new one
+
+  entries = buildIndex( fileName)
+  try:
+    with open( indexFileName, 'wb') as indexFile:
+      np.save( indexFile, entries)
+  except IOError:
+    pass # just use it this time
+  return entries
@@ -0,0 +1,447 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+csvreader -- module for reading recorded measurement files in large blocks
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+Parsing a recorded file one line at a time with parse.parse() and
+time.mktime() is slow. This module reads a large block of text at a time,
+pulls all of the fields out of the block with one regular expression scan and
+converts them to NumPy arrays.
+
+time.mktime() is only called once for each distinct minute in the block. The
+seconds are added afterwards, exactly as the line by line reader does, so the
+ticks are the same.
+
+The fast expression only accepts the plain decimal form of CSV_FORMAT. If any
+line of a block does not match it, the block is parsed a line at a time, using
+parse.parse() for the odd lines, so lines are skipped (or not) exactly as
+before. Odd lines with a pressure too big for PRESSURE_DTYPE are skipped as
+well, rather than wrapped around.
+
+openText() opens plain, gzip (.gz), bzip2 (.bz2) and xz (.xz) files and
+standard input (-). Compressed files are decompressed as they are read, a
+block at a time, so they never have to be decompressed to disk first. xz
+needs the lzma module (backports.lzma on Python 2).
+
+parseCsvFile() parses a whole file in a pool of processes. The file is split
+into ranges at line boundaries and each range is parsed exactly as a block
+would be, so the result matches reading it with CsvReader.
+"""
+
+
+#### IMPORTS ####
+
+import bz2
+import gzip
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import parse
+try:
+  import lzma
+except ImportError:
+  try:
+    from backports import lzma
+  except ImportError:
+    lzma = None # no xz support
+
+from config import CSV_FORMAT
+from config import CSV_BLOCK_SIZE
+from config import PARALLEL_RANGE_SIZE
+from config import COMPRESSED_BUFFER_SIZE
+
+
+#### CONSTANTS ####
+
+# fast form of CSV_FORMAT, e.g. "2016-05-16 19:33:11.104, 99395, 110671\n"
+CSV_PATTERN = re.compile(
+  r"^(\d{1,4})-(\d{1,2})-(\d{1,2}) (\d{1,2}):(\d{1,2}):(\d*\.\d+), " +\
+  r"(-?\d{1,9}), (-?\d{1,9})\n", re.MULTILINE)
+LINE_PATTERN = re.compile( r"[^\n]*\n|[^\n]+\Z") # lines as from readline()
+
+TICK_DTYPE = np.float64
+PRESSURE_DTYPE = np.int32
+PRESSURE_RANGE = np.iinfo( PRESSURE_DTYPE) # pressures outside are malformed
+STDIN_NAME = "-"
+COMPRESSED_SUFFIXES = (".gz", ".bz2", ".xz")
+RECORD_DTYPE = np.dtype([('tick', TICK_DTYPE),
+                         ('airPressure', PRESSURE_DTYPE),
+                         ('waterColumnPressure', PRESSURE_DTYPE)])
+
+
+#### CLASSES ####
+
+class CsvReader (object):
+  """read a recorded measurement file a block at a time
+
+  attributes:
+    inFile: open file object of the recorded measurements
+    index: csvindex entries of the recorded file, if known, for seeking
+    blockSize: (int) approximate number of bytes read for each block
+  """
+
+  def __init__ (self, inFile, blockSize=CSV_BLOCK_SIZE, index=None):
+    """Initialize a reader on an already opened file.
+
+    Args:
+      inFile: file object opened for reading
+      blockSize: (int) optional number of bytes to read at a time
+      index: optional csvindex entries of the file, needed for seek()
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.inFile = inFile
+    self.index = index
+    self.blockSize = blockSize
+
+
+  def seek (self, tick):
+    """Move close to, but not past, the first measurement at a time.
+
+    Without an index, nothing is skipped.
+
+    Args:
+      tick: (float) epoch time in s
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    if self.index is not None:
+      # last entry before the time, the entries are in time order
+      i = np.searchsorted( self.index['tick'], tick, side='left') - 1
+      if i >= 0:
+        self.inFile.seek( int( self.index['offset'][i]))
+
+
+  def readBlock (self):
+    """Read and parse the next block of whole lines.
+
+    Args:
+      None
+
+    Returns:
+      (ticks, airPressures, waterColumnPressures) arrays, possibly empty
+      if no line in the block could be parsed, or None at end of file
+
+    Raises:
+      None
+    """
+    text = self.inFile.read( self.blockSize)
+    if not text: # end of file
+      return None
+    if not text.endswith( "\n"):
+      text = text + self.inFile.readline() # finish the last line
+    return parseCsvBlock( text)
+
+
+  def close (self):
+    """close the underlying file."""
+    self.inFile.close()
+
+
+#### FUNCTIONS ####
+
+def openText (fileName):
+  """Open a recorded file for reading, decompressing it if need be
+
+  Args:
+    fileName: (str) name of the file, or "-" for standard input
+
+  Returns:
+    file object opened for reading
+
+  Raises:
+    IOError if the file cannot be opened
+  """
+  if fileName == STDIN_NAME:
+    return sys.stdin
+  if fileName.endswith( ".gz"):
+    # make sure that the file exists, gzip only complains on the first read
+    open( fileName, 'rb').close()
+    return gzip.open( fileName, 'rb')
+  if fileName.endswith( ".bz2"):
+    return bz2.BZ2File( fileName, 'r', COMPRESSED_BUFFER_SIZE)
+  if fileName.endswith( ".xz"):
+    if lzma is None:
+      raise IOError( "Reading " + fileName + " needs the lzma module")
+    return lzma.open( fileName, 'rb')
+  return open( fileName, 'r')
+
+
+def isSeekable (fileName):
+  """Check whether a recorded file can be read from any position
+
+  Standard input and compressed files can only be read from the start, so
+  they cannot be indexed or split up.
+
+  Args:
+    fileName: (str) name of the file, or "-" for standard input
+
+  Returns:
+    True for a plain file
+
+  Raises:
+    None
+  """
+  return fileName != STDIN_NAME and not fileName.endswith(
+    COMPRESSED_SUFFIXES)
+
+
+def parseCsvBlock (text):
+  """Parse a block of recorded lines into arrays
+
+  Lines that cannot be parsed are skipped.
+
+  Args:
+    text: (str) one or more whole lines in CSV_FORMAT
+
+  Returns:
+    ticks: (float array) epoch time of each measurement in s
+    airPressures: (int array) air pressures in Pascals
+    waterColumnPressures: (int array) water column pressures in Pascals
+
+  Raises:
+    None
+  """
+  fields = CSV_PATTERN.findall( text)
+  if len( fields) == text.count( "\n"): # every line has the fast form
+    return _fieldsToArrays( fields)
+
+  # some lines are odd, parse only those the slow way and merge them in
+  fields = []
+  starts = []
+  oddLines = []
+  oddStarts = []
+  position = 0
+  for match in CSV_PATTERN.finditer( text):
+    if match.start() > position:
+      _findLines( text, position, match.start(), oddLines, oddStarts)
+    fields.append( match.groups())
+    starts.append( match.start())
+    position = match.end()
+  _findLines( text, position, len( text), oddLines, oddStarts)
+
+  ticks, airPressures, waterColumnPressures = _fieldsToArrays( fields)
+  oddTicks = []
+  oddAirPressures = []
+  oddWaterColumnPressures = []
+  for i, line in enumerate( oddLines):
+    r = parse.parse (CSV_FORMAT, line)
+    if r is not None and _fitsPressure( r['airPressure']) and \
+        _fitsPressure( r['waterColumnPressure']):
+      oddTicks.append( time.mktime((r['year'], r['month'], r['day'],\
+        r['hour'], r['minute'], 0, 0,0,-1)) + r['second'])
+      oddAirPressures.append( r['airPressure'])
+      oddWaterColumnPressures.append( r['waterColumnPressure'])
+      starts.append( oddStarts[i])
+  ticks = np.concatenate(( ticks, np.array( oddTicks, dtype=TICK_DTYPE)))
+  airPressures = np.concatenate(( airPressures, np.array(
+    oddAirPressures, dtype=PRESSURE_DTYPE)))
+  waterColumnPressures = np.concatenate(( waterColumnPressures, np.array(
+    oddWaterColumnPressures, dtype=PRESSURE_DTYPE)))
+  order = np.argsort( starts, kind='mergesort') # back into file order
+  return ticks[ order], airPressures[ order], waterColumnPressures[ order]
+
+
+def _fitsPressure (pressure):
+  """check that a parsed pressure can be kept as a PRESSURE_DTYPE"""
+  return PRESSURE_RANGE.min <= pressure <= PRESSURE_RANGE.max
+
+
+def _findLines (text, start, end, lines, starts):
+  """collect the lines of a stretch of text along with their positions
+
+  Args:
+    text: (str) the whole block of text
+    start: (int) position of the first character of the stretch
+    end: (int) position just past the last character of the stretch
+    lines: (list) destination for the lines
+    starts: (list) destination for the positions of the lines
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  for match in LINE_PATTERN.finditer( text, start, end):
+    lines.append( match.group())
+    starts.append( match.start())
+
+
+def parseCsvFile (fileName, processes, rangeSize=PARALLEL_RANGE_SIZE):
+  """Parse a whole recorded file using a pool of processes
+
+  Args:
+    fileName: (str) name of the recorded file
+    processes: (int) number of worker processes
+    rangeSize: (int) optional approximate number of bytes for each worker
+      to parse at a time
+
+  Returns:
+    array of RECORD_DTYPE records in file order
+
+  Raises:
+    IOError if the file cannot be read
+  """
+  ranges = splitFile( fileName, rangeSize)
+  pool = multiprocessing.Pool( processes)
+  try:
+    blocks = pool.map( _parseRange, [( fileName, start, end)
+                                     for start, end in ranges])
+  finally:
+    pool.close()
+    pool.join()
+
+  records = np.empty( sum([ len( block[0]) for block in blocks]),
+                      dtype=RECORD_DTYPE)
+  position = 0
+  for ticks, airPressures, waterColumnPressures in blocks:
+    records['tick'][ position:position + len( ticks)] = ticks
+    records['airPressure'][ position:position + len( ticks)] = airPressures
+    records['waterColumnPressure'][ position:position + len( ticks)] = \
+        waterColumnPressures
+    position = position + len( ticks)
+  return records
+
+
+def splitFile (fileName, rangeSize):
+  """Split a file into byte ranges that start and end at line boundaries
+
+  Args:
+    fileName: (str) name of the file
+    rangeSize: (int) approximate number of bytes in each range
+
+  Returns:
+    list of (start, end) byte offsets covering the whole file
+
+  Raises:
+    IOError if the file cannot be read
+  """
+  size = os.path.getsize( fileName)
+  ranges = []
+  start = 0
+  with open( fileName, 'rb') as inFile:
+    while start < size:
+      inFile.seek( min( start + rangeSize, size))
+      inFile.readline() # up to the start of the next line
+      end = min( inFile.tell(), size)
+      ranges.append(( start, end))
+      start = end
+  return ranges
+
+
+def _parseRange (arguments):
+  """parse a byte range of a file, run in a worker process
+
+  Args:
+    arguments: (tuple) file name, start offset and end offset
+
+  Returns:
+    ticks, airPressures, waterColumnPressures arrays
+  """
+  fileName, start, end = arguments
+  with open( fileName, 'r') as inFile:
+    inFile.seek( start)
+    return parseCsvBlock( inFile.read( end - start))
+
+
+def _fieldsToArrays (fields):
+  """convert matched text fields into tick and pressure arrays
+
+  Args:
+    fields: list of tuples of the CSV_PATTERN groups
+
+  Returns:
+    ticks, airPressures, waterColumnPressures arrays
+
+  Raises:
+    None
+  """
+  if not fields:
+    return np.empty( 0, dtype=TICK_DTYPE), \
+        np.empty( 0, dtype=PRESSURE_DTYPE), \
+        np.empty( 0, dtype=PRESSURE_DTYPE)
+  columns = np.array( fields).T
+  dateParts = columns[ 0:5].astype( np.int64)
+  seconds = columns[ 5].astype( np.float64)
+
+  # one mktime() per minute is plenty, the seconds are added afterwards
+  minuteKeys = (((dateParts[0] * 100 + dateParts[1]) * 100 + dateParts[2]) *
+                100 + dateParts[3]) * 100 + dateParts[4]
+  uniqueKeys, firsts, inverse = np.unique( minuteKeys, return_index=True,
+                                           return_inverse=True)
+  minuteTicks = np.empty( len( uniqueKeys), dtype=TICK_DTYPE)
+  for i, first in enumerate( firsts):
+    year, month, day, hour, minute = [int( part) for part in
+                                      dateParts[:, first]]
+    minuteTicks[i] = time.mktime(( year, month, day, hour, minute,
+                                   0, 0, 0, -1))
+  ticks = minuteTicks[ inverse] + seconds
+
+  return ticks, columns[6].astype( PRESSURE_DTYPE), \
+      columns[7].astype( PRESSURE_DTYPE)
+
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  text = "2016-05-16 19:33:11.104, 99395, 110671\n" +\
+      "garbage line\n" +\
+      "2016-05-16 19:33:11.120, 99395, 4294967296\n" +\
+      "2016-05-16 19:33:11.137, 99396, 110672\n" +\
+      "2016-05-16 19:34:00.005, 99397, 110673\n"
+  ticks, airPressures, waterColumnPressures = parseCsvBlock( text)
+  for line in LINE_PATTERN.findall( text):
+    print parse.parse( CSV_FORMAT, line)
+  for i, tick in enumerate( ticks):
+    print repr( tick), airPressures[i], waterColumnPressures[i]
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
@@ -23,16 +23,45 @@ AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
 LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
+
+
+#### NOTES ####
+
+The dominant wave is the most powerful wave found within the last period
+seconds. The candidates are the waves that could still become the dominant
+wave, in a deque ordered by time and by falling power. A new wave drops the
+candidates at the back with no more power than it has, since they will
+expire before it does, and is added at the back. Candidates older than the
+period are dropped from the front. The front is the dominant wave.
+
+Each wave is added and dropped once, so an update takes constant time on
+average however many waves there are in the period, and value() takes
+constant time.
+
+A multi dominant finds the dominant wave over several periods, or horizons,
+from one list of candidates kept for the longest horizon. The candidates
+within a shorter horizon are the tail of the list, and the first of them is
+the most powerful wave within it, so it is found by a binary search on the
+ticks. An update costs the same however many horizons there are, and a
+value takes log time in the number of candidates.
 """
 
 #### IMPORTS ####
 
-from config import NUM_CANDIDATES
+import bisect
+import collections
 
 
 #### CLASSES ####
 
 class Dominant( object):
+    """ the most powerful wave within a period
+
+    attributes:
+      candidates: deque of (tick, period, peak, power) of the waves that
+        could be dominant, the dominant one first
+      validPeriod: float (s) number of seconds that waves are valid
+    """
 
     def __init__( self, period):
         """ initialize the attributes of the dominant wave
@@ -46,7 +75,7 @@ class Dominant( object):
         Raises:
           None
         """
-        self.candidates = []
+        self.candidates = collections.deque()
         self.validPeriod = period
 
 
@@ -63,11 +92,28 @@ class Dominant( object):
         Raises:
           None
         """
-        self.candidates = []
+        self.candidates.clear()
+
+
+    def expire( self, tick):
+        """ drops the candidates older than the valid period
+
+        Args:
+          tick: float (s) number of second in the epoch
+
+        Returns:
+          None
+
+        Raises:
+          None
+        """
+        ageLimit = tick - self.validPeriod
+        while self.candidates and self.candidates[0][0] < ageLimit:
+            self.candidates.popleft()
 
 
     def update( self, tick, period, peak, power):
-        """ maintains a list of the most dominant waves within a time period
+        """ maintains the candidates for the dominant wave within a period
       
         ..this assumes dominate power is also dominant peak and period
 
@@ -83,55 +129,172 @@ class Dominant( object):
         Raises:
           None
         """
-        # remove candidates that are too old
-        ageLimit = tick - self.validPeriod
-        done = False
-        while not done and len(self.candidates) > 0:
-            for i, candidate in enumerate( self.candidates): 
-                if candidate[0] < ageLimit:
-                    self.candidates.pop(i)
-                    break
-            done = True
-
-        # if there is a vacancy, add the new value regardless of value
-        if len( self.candidates) < NUM_CANDIDATES:
-            self.candidates.append( (tick, period, peak, power))
-
-        # elif new value is greater than smallest on list, replace it
-        else:
-            minPower = power
-            minIndex = None
-            for i, candidate in enumerate( self.candidates):
-                if candidate[ 3] < minPower:
-                    minIndex = i
-                    minPower = candidate[ 3]
-            if minIndex is not None:
-                self.candidates.pop(i)
-                self.candidates.append( (tick, period, peak, power))
+        while self.candidates and self.candidates[-1][3] <= power:
+            self.candidates.pop()
+        self.candidates.append( (tick, period, peak, power))
+        self.expire( tick)
 
     
-    def value( self):
+    def value( self, tick=None):
         """ returns the dominant wave period, peak, and power
       
         Args:
-          None
+          tick: float (s) optional epoch to expire older waves at, otherwise
+            the waves are as of the latest update
         
         Returns:
-          tuple of the period, peak and power of dominant wave
+          tuple of the period, peak and power of dominant wave, None if
+          there are no waves within the period
         
         Raises:
           None
         """
-        maxPower = 0
-        for i, candidate in enumerate( self.candidates):
-            if candidate[ 3] > maxPower:
-                maxIndex = i
-                maxPower = candidate[ 3]
-        return (self.candidates[i][1], self.candidates[i][2], \
-                    self.candidates[i][3])
+        if tick is not None:
+            self.expire( tick)
+        if not self.candidates:
+            return None
+        return self.candidates[0][1:]
+
+
+class MultiDominant( object):
+    """ the most powerful waves within several horizons
+
+    attributes:
+      horizons: list of float (s) periods that waves are valid for
+    """
+
+    def __init__( self, horizons):
+        """ initialize the attributes of the dominant waves
+
+        Args:
+          horizons: list of float (s) periods that waves are valid for
+
+        Returns:
+          None
+
+        Raises:
+          None
+        """
+        self.horizons = sorted( horizons)
+        self._ticks = [] # tick of each candidate
+        self._waves = [] # (tick, period, peak, power) of each candidate
+        self._head = 0 # index of the oldest candidate still kept
+        self._latestTick = None
+
+
+    def reset( self):
+        """ resets the candidates for the dominant waves
+
+        Args:
+          None
+
+        Returns:
+          None
+
+        Raises:
+          None
+        """
+        self._ticks = []
+        self._waves = []
+        self._head = 0
+        self._latestTick = None
+
+
+    def expire( self, tick):
+        """ drops the candidates older than the longest horizon
+
+        Args:
+          tick: float (s) number of second in the epoch
+
+        Returns:
+          None
+
+        Raises:
+          None
+        """
+        ageLimit = tick - self.horizons[-1]
+        while self._head < len( self._ticks) and \
+                self._ticks[ self._head] < ageLimit:
+            self._head = self._head + 1
+        if self._head > len( self._ticks) // 2: # drop the expired ones
+            del self._ticks[ :self._head]
+            del self._waves[ :self._head]
+            self._head = 0
+
+
+    def update( self, tick, period, peak, power):
+        """ maintains the candidates for the dominant waves
+
+        Args:
+          tick: float (s) number of second in the epoch
+          period: float (s) The wave period of the measured wave
+          peak: float (in) The peak-to-peak height of a wave in inches
+          power: float (mW?) The power of the wave
+
+        Returns:
+          None
+
+        Raises:
+          None
+        """
+        while len( self._waves) > self._head and \
+                self._waves[-1][3] <= power:
+            self._waves.pop()
+            self._ticks.pop()
+        self._waves.append( (tick, period, peak, power))
+        self._ticks.append( tick)
+        self._latestTick = tick
+        self.expire( tick)
+
+
+    def value( self, horizon, tick=None):
+        """ returns the dominant wave period, peak, and power for a horizon
+
+        Args:
+          horizon: float (s) period that waves are valid for, not longer
+            than the longest horizon
+          tick: float (s) optional epoch at the end of the horizon,
+            otherwise the tick of the latest update
+
+        Returns:
+          tuple of the period, peak and power of dominant wave, None if
+          there are no waves within the horizon
+
+        Raises:
+          None
+        """
+        if tick is None:
+            tick = self._latestTick
+        if tick is None:
+            return None
+        index = bisect.bisect_left( self._ticks, tick - horizon, self._head)
+        if index == len( self._ticks):
+            return None
+        return self._waves[ index][1:]
+
 
+    def values( self, tick=None):
+        """ returns the dominant waves for all of the horizons
 
-def test(self):
+        Args:
+          tick: float (s) optional epoch at the end of the horizons,
+            otherwise the tick of the latest update
+
+        Returns:
+          list of ( horizon, value) pairs, value as from value()
+
+        Raises:
+          None
+        """
+        if tick is not None:
+            self.expire( tick)
+        return [ (horizon, self.value( horizon, tick))
+                 for horizon in self.horizons]
+
+
+#### FUNCTIONS ####
+
+def test():
     """Test the functions and methods of this module.
   
     Args:
@@ -143,11 +306,30 @@ def test(self):
     Raises:
       None
     """
-    pass
+    import random
+
+    rand = random.Random( 1)
+    waves = [(tick, rand.uniform( 1, 5), rand.uniform( 1, 8),
+              rand.uniform( 0, 100)) for tick in range( 0, 3600, 3)]
+    dominantWave = Dominant( 600)
+    for i, wave in enumerate( waves):
+        dominantWave.update( *wave)
+        recent = [w for w in waves[ :i + 1] if w[0] >= wave[0] - 600]
+        assert dominantWave.value() == max( recent, key=lambda w: w[3])[1:]
+    print "dominant", dominantWave.value(), "of", \
+        len( dominantWave.candidates), "candidates"
+    print "an hour later", dominantWave.value( waves[-1][0] + 3600)
+
+    multi = MultiDominant( [60, 600, 1800])
+    for i, wave in enumerate( waves):
+        multi.update( *wave)
+        for horizon, value in multi.values():
+            recent = [w for w in waves[ :i + 1] if w[0] >= wave[0] - horizon]
+            assert value == max( recent, key=lambda w: w[3])[1:]
+    for horizon, value in multi.values():
+        print "horizon", horizon, "dominant", value
 
 
 if __name__ == "__main__":
   # execute only if run as a script
-  #RW = sdominant(0) 
-  #RW.test()
   test()
@@ -26,8 +26,6 @@ THE SOFTWARE.
 
 #### IMPORTS ####
 
-import datetime
-
 import average
 import config
 import influx
@@ -122,7 +120,7 @@ class FindWake( object):
         Raises:
           None
         """
-        dtd = datetime.datetime.fromtimestamp(tick)
+        dtd = self.sched.clock.datetime(tick)
         print "{:%y/%m/%d %H:%M:%S}.{:02d} waveType".format( dtd, dtd.microsecond/10000),
         print "per:{:.2f} pk:{:.2f} pow:{:.2f} {:s}".format(\
                 period, \
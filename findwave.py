@@ -23,15 +23,49 @@ AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
 LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
+
+
+#### NOTES ####
+
+A wave runs from one upward zero crossing of the filtered wave height to the
+next. findWave() takes one wave height at a time. findWaves() takes a block
+of them and finds the crossings, the peak of each run of one sign and the
+waves with numpy, carrying the same state across blocks, so it finds the
+same waves with the same values as findWave() would one at a time.
 """
 
 #### IMPORTS ####
 
 import math
 
+import numpy as np
+
 #from config import POWER_CONSTANT 
 
 
+#### CONSTANTS ####
+
+# ALT wave power calculation
+G = 32.174 # gravitation constant ft/s/s
+DENSITY = 62.29 # density of water pounds/ft/ft/ft
+DEPTH = 4 # water depth ft, variable depending on measurement loc
+#waveSpeed = math.sqrt( math.tanh( 2 * math.pi * depth /
+#    self.wavePeakToPeak/12) *\
+#    g * waveLength / 2 / math.pi)
+#waveLength = waveSpeed * wavePeriod
+#
+#waveSpeed = g * wavePeriod/2/pi # for wavelength / water depth
+#    ratio < 0.5...depth>2*wavelen
+# we are not there... 8ft wave needs 4 feet of water,
+#    30ft wave needs 15 feet of water
+# shallow formula: period velocity = square root(g * water depth)
+WAVE_SPEED = math.sqrt( G * 4) # feet/s
+POWER_FACTOR = G * DENSITY
+LENGTH_FACTOR = 2 * math.pi * DEPTH
+SINH_FACTOR = 4 * 3.159 * DEPTH
+MAXIMUM_PERIOD = 90 # s, reasonableness check
+
+
 #### CLASSES ####
 
 # pylint: disable=too-few-public-methods
@@ -92,34 +126,9 @@ class FindWave (object):
   
           #self.wavePower = POWER_CONSTANT * self.wavePeakToPeak * \
           #    self.wavePeakToPeak * self.wavePeriod 
-  
-          #ALT wave power calculation
-          g = 32.174 # gravitation constant ft/s/s
-          density = 62.29 # density of water pounds/ft/ft/ft
-          depth = 4 # water depth ft, variable depending on measurement loc
-  
-          #waveSpeed = math.sqrt( math.tanh( 2 * math.pi * depth /
-          #    self.wavePeakToPeak/12) *\
-          #    g * waveLength / 2 / math.pi)
-          #waveLength = waveSpeed * wavePeriod
-          #
-          #waveSpeed = g * wavePeriod/2/pi # for wavelength / water depth
-          #    ratio < 0.5...depth>2*wavelen
-          # we are not there... 8ft wave needs 4 feet of water,
-          #    30ft wave needs 15 feet of water
-          # shallow formula: period velocity = square root(g * water depth)
-          waveSpeed = math.sqrt(g * 4) # feet/s
-          waveLength = self.wavePeriod * waveSpeed # feet
-  
-          waveHeight = self.wavePeakToPeak/12 # in feet
-          self.wavePower = g * density * waveHeight * waveHeight * \
-             waveSpeed * (.5 + (2 * math.pi * depth / waveLength) / \
-                math.sinh (4 * 3.159 * depth / waveLength)) / 8 # in HP
-  	
-  
-          #end ALT wave power calculation
-  
-          if self.wavePeriod < 90: # s, reasonableness check
+          self.wavePower = wavePower( self.wavePeriod, self.wavePeakToPeak)
+
+          if self.wavePeriod < MAXIMUM_PERIOD:
             waveFound = True
     
         else: # end of positive period, the first half of a wave
@@ -140,10 +149,113 @@ class FindWave (object):
     return waveFound
 
 
+  def findWaves (self, ticks, heights):
+    """analyze a block of wave heights to find the waves in it.
+
+    Args:
+      ticks: (float array) increasing epochs in s.
+      heights: (float array) wave heights above or below average.
+
+    Returns:
+      waveTicks: (float array) epochs in s where the waves ended
+      periods: (float array) periods of the waves in s
+      peakToPeaks: (float array) peak to peak heights of the waves
+      powers: (float array) powers of the waves
+      These are the waves findWave() would have found, and the wave
+      attributes are left as it would have left them.
+
+    Raises:
+      None
+    """
+    ticks = np.asarray( ticks, dtype=np.float64)
+    heights = np.asarray( heights, dtype=np.float64)
+    if self._firstTime and len( ticks) > 0:
+      self.findWave( ticks[0], heights[0])
+      ticks = ticks[ 1:]
+      heights = heights[ 1:]
+    if len( ticks) == 0:
+      return np.empty( 0), np.empty( 0), np.empty( 0), np.empty( 0)
+
+    positive = heights >= 0
+    crossings = np.flatnonzero( positive != np.concatenate((
+      [self._lastPositiveTrend], positive[ :-1])))
+
+    # the peak of each run of one sign: the run before the one in progress,
+    # the run in progress, then the run starting at each crossing
+    if self._lastPositiveTrend:
+      peaks = [self._negativePeak, self._positivePeak]
+      reduction = max
+    else:
+      peaks = [self._positivePeak, self._negativePeak]
+      reduction = min
+    first = len( heights) if len( crossings) == 0 else crossings[0]
+    if first > 0:
+      peaks[1] = reduction( peaks[1], reduction( heights[ :first].tolist()))
+    if len( crossings) > 0:
+      highs = np.maximum.reduceat( heights, crossings)
+      lows = np.minimum.reduceat( heights, crossings)
+      peaks = np.concatenate(( peaks, np.where( positive[ crossings],
+                                                highs, lows)))
+    else:
+      peaks = np.array( peaks)
+
+    # the time between crossings, the first from the crossing in progress
+    crossingTicks = ticks[ crossings]
+    halfPeriods = crossingTicks - np.concatenate((
+      [self._zeroCrossingTick], crossingTicks[ :-1]))
+    positivePeriods = np.concatenate((
+      [self._positivePeriod], halfPeriods[ :-1]))
+
+    upward = np.flatnonzero( positive[ crossings])
+    periods = positivePeriods[ upward] + halfPeriods[ upward]
+    peakToPeaks = peaks[ upward] - peaks[ upward + 1]
+    powers = wavePower( periods, peakToPeaks)
+
+    # leave the state as findWave() would
+    self._lastPositiveTrend = bool( positive[-1])
+    self._positivePeak = peaks[-1] if positive[-1] else peaks[-2]
+    self._negativePeak = peaks[-2] if positive[-1] else peaks[-1]
+    if len( crossings) > 0:
+      self._zeroCrossingTick = crossingTicks[-1]
+      downward = np.flatnonzero( ~positive[ crossings])
+      if len( downward) > 0:
+        self._positivePeriod = halfPeriods[ downward[-1]]
+    if len( upward) > 0:
+      self._negativePeriod = halfPeriods[ upward[-1]]
+      self.waveTick = crossingTicks[ upward[-1]]
+      self.wavePeriod = periods[-1]
+      self.wavePeakToPeak = peakToPeaks[-1]
+      self.wavePower = powers[-1]
+
+    found = periods < MAXIMUM_PERIOD
+    return crossingTicks[ upward][ found], periods[ found], \
+        peakToPeaks[ found], powers[ found]
+
+
 #pylint: enable=too-many-instance-attributes
 #pylint: enable=too-few-public-methods
-  
-  
+
+
+def wavePower (period, peakToPeak):
+  """Get the power of a wave, of one or an array of waves.
+
+  Args:
+    period: (float or float array) s
+    peakToPeak: (float or float array) inches
+
+  Returns:
+    (float or float array) power in HP
+
+  Raises:
+    None
+  """
+  waveLength = period * WAVE_SPEED # feet
+  waveHeight = peakToPeak / 12 # in feet
+  return POWER_FACTOR * waveHeight * waveHeight * \
+     WAVE_SPEED * (.5 + (LENGTH_FACTOR / waveLength) / \
+        np.sinh (SINH_FACTOR / waveLength)) / 8 # in HP
+
+
 def test():
   """ perform unit tests on this module
 
@@ -156,7 +268,34 @@ def test():
   Raises:
     None
   """
-  
+  import time
+
+  jitter = np.random.RandomState( 1)
+  ticks = 1533571200 + np.arange( 20000) / 30.
+  heights = np.sin( ticks / 1.7) * ( 2 + np.sin( ticks / 40.)) + \
+      jitter.normal( 0, .3, len( ticks))
+
+  start = time.time()
+  scalar = FindWave()
+  waves = []
+  for tick, height in zip( ticks.tolist(), heights.tolist()):
+    if scalar.findWave( tick, height):
+      waves.append(( scalar.waveTick, scalar.wavePeriod,
+                     scalar.wavePeakToPeak, scalar.wavePower))
+  scalarTime = time.time() - start
+
+  start = time.time()
+  block = FindWave()
+  found = [block.findWaves( ticks[ first:first + 97],
+                            heights[ first:first + 97])
+           for first in range( 0, len( ticks), 97)]
+  blockTime = time.time() - start
+  blockWaves = zip( *[ np.concatenate( column) for column in zip( *found)])
+  print len( waves), "waves in {0:.3f} s, {1:.3f} s in blocks".format(
+    scalarTime, blockTime)
+  print "identical:", [ tuple( wave) for wave in blockWaves] == waves and \
+      block.__dict__ == scalar.__dict__
+
 
 
 if __name__ == "__main__":
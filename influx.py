@@ -9,9 +9,9 @@ to send data points to that database.
 """
 
 #### IMPORTS ####
-import datetime
-
 from influxdb import InfluxDBClient
+
+import clock
 from config import INFLUXDB_HOST
 from config import INFLUXDB_PORT
 from config import INFLUXDB_POLICY_NAME
@@ -25,11 +25,13 @@ from config import INFLUXDB_POLICY
 class Influx ( object):
   """Communication with an InfluxDB."""
 
-  def __init__( self, databaseName):
+  def __init__( self, databaseName, influxClock=None):
     """initialize communication with an InfluxDB
   
     Args:
       databaseName: name of the database within the particular server
+      influxClock: (clock.Clock) optional clock for the point times, a live
+        clock by default
   
     Returns:
       None
@@ -46,6 +48,9 @@ class Influx ( object):
                                           database=databaseName)
     self.client.switch_database( databaseName)
     self.influxWrites = 0
+    if influxClock is None:
+      influxClock = clock.Clock()
+    self.clock = influxClock
 
 
   def sendPoint( self, currentTick, measurement, fieldType, value):
@@ -69,7 +74,7 @@ class Influx ( object):
         "measurement" : measurement,
         #"time": "{0:%Y-%m-%dT%H:%M:%S.%fZ-04}".format(
         "time": "{0:%Y-%m-%dT%H:%M:%S.%f-0400}".format(
-          datetime.datetime.fromtimestamp(currentTick)),
+          self.clock.datetime( currentTick)),
         "fields" : {
           fieldType : value+0.
         }
@@ -103,7 +108,7 @@ class Influx ( object):
         },
         #"time": "{0:%Y-%m-%dT%H:%M:%S.%fZ-04}".format(
         "time": "{0:%Y-%m-%dT%H:%M:%S.%f-0400}".format(
-          datetime.datetime.fromtimestamp(currentTick)),
+          self.clock.datetime( currentTick)),
         "fields" : {
           fieldType : value+0.
         }
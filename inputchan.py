@@ -33,20 +33,20 @@ THE SOFTWARE.
 #### IMPORTS ####
 
 import sys
-import random
 
 #import logging
-import time
-import parse
-
-from config import BASE_AIR_PRESSURE
-from config import SWING_AIR_PRESSURE
-from config import BASE_WATER_COLUMN_PRESSURE
-from config import SWING_WATER_COLUMN_PRESSURE
-from config import DESIRED_PERIOD
-from config import CSV_FORMAT
+
+import numpy as np
+
+import capture
+import clock
+import csvcache
+import csvindex
+import csvreader
+import synthetic
 from config import PA_TO_INCH
 from config import WATER_COLUMN_OFFSET
+from config import CACHE_REPLAYS
 
 
 
@@ -62,6 +62,11 @@ class InputChannel (object):
   attributes:
     type
     inFile
+    reader: block reader for recorded files, captures and synthetic
+      measurements
+    recorder: capture.CaptureRecorder for recording measurements, if any
+    cacheWriter: csvcache.CacheWriter while a recorded file is first parsed
+    clock: clock.Clock giving the time of sensor measurements
 
     airPressure
     waterColumnPressure
@@ -69,9 +74,26 @@ class InputChannel (object):
 
   """
 
-  def __init__ (self, inputFileName):
+  # pylint: disable=too-many-arguments
+  def __init__ (self, inputFileName, recordFileName=None, startTick=None,
+                endTick=None, processes=1, inputClock=None):
     """Open an input channel that can produce measurements.
 
+    Args:
+      inputFileName: (str) '-R' for synthetic, '-S' for sensors, the name of
+        a recorded text file (which may be compressed) or binary capture
+        file, or '-' for a recorded text file on standard input
+      recordFileName: (str) optional capture file for recording the
+        measurements as they are read, normally in sensor mode
+      startTick: (float) optional epoch in s of the first measurement wanted
+        from a recorded file or capture, or of the first synthetic one
+      endTick: (float) optional epoch in s of the last measurement wanted
+        from a recorded file or capture
+      processes: (int) optional number of processes for parsing a recorded
+        file all at once, 1 parses it a block at a time as it is replayed
+      inputClock: (clock.Clock) optional clock for the time of sensor
+        measurements, a live clock by default
+
     Returns:
       InputChannel object
     """
@@ -83,20 +105,72 @@ class InputChannel (object):
     self.waterColumnPressure = 0
     self.level = 0
     self.tick = 0
+    self.inFile = None
+    self.reader = None
+    self.recorder = None
+    self.cacheWriter = None
+    self.startTick = startTick
+    self.endTick = endTick
+    self._ended = False
+    self._clearBlock()
+    if inputClock is None:
+      inputClock = clock.Clock()
+    self.clock = inputClock
 
     if inputFileName == '-R': #random
       self.type = "random"
       self.inFile = None
+      if startTick is None:
+        self.reader = synthetic.SeaGenerator()
+      else:
+        self.reader = synthetic.SeaGenerator( startTick=startTick)
     elif inputFileName == '-S': #sensors
       self.type = "sensor"
       self.inFile = None
+    elif capture.isCapture( inputFileName): #binary capture
+      self.type = "capture"
+      self.inFile = None
+      self.reader = capture.CaptureReader( inputFileName)
     elif inputFileName != '': #filename
       self.type = "file"
-      try:
-        self.inFile = open(inputFileName, 'r')
-      except IOError:
-        #logging.error("Cannot open input file " + inputFileName)
-        self.success = False
+      records = None
+      seekable = csvreader.isSeekable( inputFileName)
+      cacheable = CACHE_REPLAYS and inputFileName != csvreader.STDIN_NAME
+      if cacheable:
+        records = csvcache.openCache( inputFileName)
+      if records is None and processes > 1 and seekable:
+        try:
+          records = csvreader.parseCsvFile( inputFileName, processes)
+          if cacheable:
+            cacheWriter = csvcache.CacheWriter( inputFileName)
+            cacheWriter.recordBlock( records['tick'], records['airPressure'],
+                                     records['waterColumnPressure'])
+            cacheWriter.commit()
+        except (IOError, OSError):
+          if records is None:
+            self.success = False
+          else:
+            print "Cannot cache " + inputFileName
+      if records is not None: # already parsed, replay the records
+        self.reader = capture.RecordReader( records)
+      elif self.success:
+        try:
+          self.inFile = csvreader.openText( inputFileName)
+          if startTick is None or not seekable:
+            self.reader = csvreader.CsvReader( self.inFile)
+          else:
+            self.reader = csvreader.CsvReader(
+              self.inFile, index=csvindex.loadIndex( inputFileName))
+        except IOError:
+          #logging.error("Cannot open input file " + inputFileName)
+          self.success = False
+        # only a replay of the whole file can be cached
+        if self.success and cacheable and startTick is None and \
+            endTick is None:
+          try:
+            self.cacheWriter = csvcache.CacheWriter( inputFileName)
+          except (IOError, OSError):
+            print "Cannot cache " + inputFileName
       #except Exception as e:
       #  # handle any other exception
       #  print "Error '{0}' occured. Arguments {1}.".format(e.message, e.args)
@@ -107,11 +181,30 @@ class InputChannel (object):
       print "Bad argument to create InputChannel"
       self.success = False
 
+    if self.success and self.type in ('file', 'capture') and \
+        startTick is not None:
+      self.reader.seek( startTick)
+
+    if self.success and recordFileName is not None:
+      try:
+        self.recorder = capture.CaptureRecorder( recordFileName)
+      except IOError:
+        print "Cannot record to " + recordFileName
+        self.success = False
+  # pylint: enable=too-many-arguments
+
 
   def close (self):
     """close an open input channel."""
-    if self.inFile is not None:
+    if self.cacheWriter is not None: # not read to the end
+      self.cacheWriter.abandon()
+      self.cacheWriter = None
+    if self.reader is not None:
+      self.reader.close()
+    elif self.inFile is not None:
       self.inFile.close()
+    if self.recorder is not None:
+      self.recorder.close()
 
 
   def getWaterLevel (self, tick):
@@ -131,12 +224,48 @@ class InputChannel (object):
     """
     self.tick, self.airPressure, self.waterColumnPressure = \
         self.readMeasurement( tick)
+    if self.recorder is not None:
+      self.recorder.record( self.tick, self.airPressure,
+                            self.waterColumnPressure)
     #convert pressures to instantaneous water level
     self.level = convertPascalsToInches (
       self.waterColumnPressure - self.airPressure)
     return self.tick, self.level
 
 
+  def blocks (self, size):
+    """generate blocks of water level measurements
+
+    This is for batch consumers. It continues from where getWaterLevel()
+    left off and the conversion to water levels is done on the whole block.
+    Sensor measurements are still read one at a time.
+
+    Args:
+      size: (int) number of measurements in each block, the last block of
+        a recorded file may be shorter
+
+    Yields:
+      ticks: (float array) epoch times of the measurements in s
+      levels: (float array) inches of water level
+
+    Raises:
+      None
+    """
+    while True:
+      block = self._takeBlock( size)
+      if block is None: # end of the recorded file
+        return
+      ticks, airPressures, waterColumnPressures = block
+      if self.recorder is not None:
+        self.recorder.recordBlock( ticks, airPressures, waterColumnPressures)
+      levels = convertPascalsToInches( waterColumnPressures - airPressures)
+      self.tick = float( ticks[-1])
+      self.airPressure = int( airPressures[-1])
+      self.waterColumnPressure = int( waterColumnPressures[-1])
+      self.level = float( levels[-1])
+      yield ticks, levels
+
+
   def readMeasurement ( self, tick):
     """Get a measurement tuple (time, air pressure and water column presssure)
     from a previosly initialized input channel
@@ -150,42 +279,150 @@ class InputChannel (object):
       waterColumnPressure: (int) water column pressure in Pascals
   
     Raises:
-      None
+      IOError in sensor mode, as the pressure sensors are not hooked up yet
     """
-    if self.type == 'random':
-      airPressure = BASE_AIR_PRESSURE + random.randrange(
-        SWING_AIR_PRESSURE)
-      waterColumnPressure = BASE_WATER_COLUMN_PRESSURE + \
-          random.randrange( SWING_WATER_COLUMN_PRESSURE)
-      tick = tick + DESIRED_PERIOD
-      return tick, airPressure, waterColumnPressure
-  
-    elif self.type == 'sensors':
+    if self.type == 'sensor':
       #HOLD airPressure = airPressureSensor.read_pressure()
       #HOLD waterColumnPressue = waterColumnSensor.read_pressure()
-      tick = time.time()
-      return tick, airPressure, waterColumnPressure
+      #HOLD tick = self.clock.now()
+      #HOLD return tick, airPressure, waterColumnPressure
+      raise IOError( "Pressure sensors are not hooked up yet")
   
-    elif self.type == 'file':
-      # read lines until one can be parsed or end of file is reached
-      while True:
-        line = self.inFile.readline()
-        if not line: # end of file
-          self.inFile.close()
-          print "\nExiting at end of input file."
-          sys.exit(1)
-        else:
-          r = parse.parse (CSV_FORMAT, line)
-          if r is not None:
-            tick = time.mktime((r['year'], r['month'], r['day'],\
-              r['hour'], r['minute'], 0, 0,0,-1)) + r['second']
-            return tick, r['airPressure'], r['waterColumnPressure']
+    elif self.type in ('random', 'file', 'capture'):
+      # hand out the block a measurement at a time
+      if self._next >= len( self._ticks) and not self._fillBlock():
+        self.close()
+        print "\nExiting at end of input file."
+        sys.exit(1)
+      i = self._next
+      self._next = i + 1
+      return float( self._ticks[i]), int( self._airPressures[i]), \
+          int( self._waterColumnPressures[i])
     else:
       print "InputChannel is not initialized"
       sys.exit(2)
 
 
 
+  def readBlock (self):
+    """Get the next block of measurements from a recorded file, capture or
+    synthetic sea
+
+    This is for batch consumers. It continues from where readMeasurement()
+    and getWaterLevel() left off.
+
+    Args:
+      None
+
+    Returns:
+      ticks: (float array) epoch times of the measurements in s
+      airPressures: (int array) air pressures in Pascals
+      waterColumnPressures: (int array) water column pressures in Pascals
+      or None at end of file
+
+    Raises:
+      None
+    """
+    if self._next >= len( self._ticks) and not self._fillBlock():
+      return None
+    block = ( self._ticks[ self._next:],
+              self._airPressures[ self._next:],
+              self._waterColumnPressures[ self._next:])
+    self._clearBlock()
+    return block
+
+
+  def _takeBlock (self, size):
+    """get the next size measurements as arrays
+
+    Returns:
+      ticks, airPressures, waterColumnPressures arrays or None at the end
+    """
+    if self.reader is None: # sensor, one at a time
+      tick = self.tick
+      measurements = []
+      for _ in xrange( size):
+        tick, airPressure, waterColumnPressure = self.readMeasurement( tick)
+        measurements.append(( tick, airPressure, waterColumnPressure))
+      ticks, airPressures, waterColumnPressures = zip( *measurements)
+      return np.array( ticks), np.array( airPressures), \
+          np.array( waterColumnPressures)
+
+    pieces = []
+    count = 0
+    while count < size:
+      if self._next >= len( self._ticks) and not self._fillBlock():
+        break
+      end = min( self._next + size - count, len( self._ticks))
+      pieces.append(( self._ticks[ self._next:end],
+                      self._airPressures[ self._next:end],
+                      self._waterColumnPressures[ self._next:end]))
+      count = count + end - self._next
+      self._next = end
+    if not pieces:
+      return None
+    if len( pieces) == 1:
+      return pieces[0]
+    return [np.concatenate( piece) for piece in zip( *pieces)]
+
+
+  def _fillBlock (self):
+    """read blocks until one has measurements
+
+    Returns:
+      True if measurements are available, False at end of file
+    """
+    self._clearBlock()
+    while not self._ended:
+      block = self.reader.readBlock()
+      if block is None:
+        if self.cacheWriter is not None: # the whole file has been parsed
+          self.cacheWriter.commit()
+          self.cacheWriter = None
+        return False
+      if self.cacheWriter is not None:
+        self.cacheWriter.recordBlock( *block)
+      block = self._limitBlock( *block)
+      if len( block[0]) > 0:
+        self._ticks, self._airPressures, self._waterColumnPressures = block
+        return True
+    return False
+
+
+  def _limitBlock (self, ticks, airPressures, waterColumnPressures):
+    """trim a block to the measurements between startTick and endTick
+
+    Returns:
+      ticks, airPressures, waterColumnPressures arrays
+    """
+    first = 0
+    last = len( ticks)
+    if self.startTick is not None:
+      # seeking only gets close, skip up to the first wanted measurement
+      later = np.flatnonzero( ticks >= self.startTick)
+      if len( later) == 0:
+        first = last
+      else:
+        first = later[0]
+        self.startTick = None
+    if self.endTick is not None:
+      after = np.flatnonzero( ticks[ first:] > self.endTick)
+      if len( after) > 0:
+        last = first + after[0]
+        self._ended = True
+    return ticks[ first:last], airPressures[ first:last], \
+        waterColumnPressures[ first:last]
+
+
+  def _clearBlock (self):
+    """forget the current block of measurements"""
+    self._ticks = ()
+    self._airPressures = ()
+    self._waterColumnPressures = ()
+    self._next = 0
+
+
+
 #### FUNCTIONS ####
 
 
@@ -274,10 +511,10 @@ def convertPascalsToInches (pressurePa):
   """convert a pressure in Pascals to inches of water above a particular datum
 
   Args:
-    input: pressure in Pascals (int)
+    input: pressure in Pascals (int or int array)
   
   Returns:
-    equivalent inches of water above a datum
+    equivalent inches of water above a datum (float or float array)
   
   Raises:
     None
@@ -68,10 +68,10 @@ BUG
 #### IMPORTS ####
 
 import sys
-import datetime
 import math
 
 import average
+import clock
 import cluster
 import dominant
 
@@ -81,16 +81,23 @@ import highlow
 import influx
 import inputchan
 import lowpass
+import multirate
 import mysched
+import peakfit
+import regrid
 import report
 import resamples
+import spectrogram
+import spectrum
 import stats
 import trap
+import zoom
 from config import BOAT_LENGTHS
 from config import GRAVITY_CONSTANT
 from config import CLUSTER_WINDOW
 from config import TARGET_PERIODS
 from config import SEND_START_RESPONSES
+from config import SEND_SPECTROGRAM
 from config import LONG_AVE_SAMPLES
 from config import BASELINE_AVE_SAMPLES
 from config import CLUSTER_MULTIPLIER
@@ -98,11 +105,28 @@ from config import SEND_RAW_MEASUREMENTS
 from config import SEND_RAW_WAVES
 from config import INFLUXDB_DATABASE
 from config import DOMINANT_WAVE_PERIOD
+from config import DOMINANT_WAVE_HORIZONS
+from config import INPUT_BLOCK_SIZE
+from config import MINIMUM_NUMBER_OF_CYCLES
+from config import SPECTRUM_ENGINE
+from config import SHARED_SPECTRUM
+from config import MULTIRATE_SPECTRUM
+from config import ZOOM_SPECTRUM
+from config import SPECTROGRAM
 
 #### LOCAL CONSTANTS ####
 
 errorMessage = \
-    'try: ', sys.argv[0] + ' -i <inputFileName> -o <outputFileBaseName>'
+    'try: ', sys.argv[0] + ' -i <inputFileName> -o <outputFileBaseName>' +\
+    ' [-r <captureFileName>] [--start <time>] [--end <time>]' +\
+    ' [-j <parsingProcesses>] [--speed <replaySpeed>]'
+
+TIME_ARGUMENT_FORMATS = [ # local time, like the recorded files
+  "%Y-%m-%d %H:%M:%S",
+  "%Y-%m-%d %H:%M",
+  "%Y-%m-%dT%H:%M:%S",
+  "%Y-%m-%dT%H:%M",
+  "%Y-%m-%d"]
 
 EVERY_200_MSEC =           200./1000  # do every 200 milliseconds
 EVERY_SECOND =               1 # do every second
@@ -132,12 +156,15 @@ DUR_30_MINUTES =     30 * 60
 
 outChan = None
 currentTick = None
-mainSched = mysched.Schedule()
-ifx = influx.Influx(INFLUXDB_DATABASE)
+mainClock = clock.Clock()
+mainSched = mysched.Schedule( mainClock)
+ifx = None
 
 dominantWave = None
 waveLengthSamples = None
 periodSamples = None
+spectrumHistory = None # shared by both unless the RESAMPLE_SPECTRUM engine
+waveSpectrogram = None
 
 #longWaterLevel = None
 longWaterLevelAve = None
@@ -208,25 +235,38 @@ def processCommandLineArguments():
   """Process the command line arguments
 
   This processes the command line arguments, currently to set the
-  input file name (if any) and the output file base name.
+  input file name (if any), the output file base name, the capture file
+  name (if any) for recording the measurements, the start and end times
+  (if any) of a replay, the number of processes for parsing a recorded
+  file and the replay speed.
   
   Args:
     None
   
   Returns:
-    inputFileName, outputFileBaseName
+    options: dictionary with inputFileName, outputFileBaseName,
+      recordFileName, startTick, endTick, processes and speed, which is
+      None for live sensors or as fast as possible, otherwise the number of
+      measurement seconds replayed per second
   
   Raises:
     None
   """
   import getopt                          # for argv parsing
 
-  inputFileName = ''
-  outputFileBaseName = 'test'
+  options = {
+    'inputFileName': '',
+    'outputFileBaseName': 'test',
+    'recordFileName': None,
+    'startTick': None,
+    'endTick': None,
+    'processes': 1,
+    'speed': None
+  }
   #print "args: ", str( sys.argv)
   try:
-    opts, remainder = getopt.getopt( sys.argv[1:], "hi:o:", [
-      "ifile=", "ofile="])
+    opts, remainder = getopt.getopt( sys.argv[1:], "hi:o:r:j:", [
+      "ifile=", "ofile=", "record=", "start=", "end=", "jobs=", "speed="])
     if remainder != []:
       print errorMessage
       sys.exit(2)
@@ -242,14 +282,57 @@ def processCommandLineArguments():
         print errorMessage
         sys.exit()
       elif opt in ("-i", "--ifile"):
-        inputFileName = arg
+        options['inputFileName'] = arg
         #print "Input file is: " + inputFileName
       elif opt in ("-o", "--ofile"):
-        outputFileBaseName = arg
+        options['outputFileBaseName'] = arg
         #print "Output file base name is: " + outputFileBaseName
-  #print "inputFileName, outputFileBaseName: '" + inputFileName + "' '" +
-  #    outputFileBaseName + "'"
-  return inputFileName, outputFileBaseName
+      elif opt in ("-r", "--record"):
+        options['recordFileName'] = arg
+      elif opt == "--start":
+        options['startTick'] = parseTimeArgument( arg)
+      elif opt == "--end":
+        options['endTick'] = parseTimeArgument( arg)
+      elif opt in ("-j", "--jobs"):
+        try:
+          options['processes'] = max( 1, int( arg))
+        except ValueError:
+          print errorMessage
+          sys.exit(2)
+      elif opt == "--speed":
+        try:
+          options['speed'] = float( arg)
+        except ValueError:
+          print errorMessage
+          sys.exit(2)
+        if options['speed'] <= 0: # as fast as possible
+          options['speed'] = None
+  #print "options: ", options
+  return options
+
+
+def parseTimeArgument( arg):
+  """Convert a local time argument like "2018-08-06 14:32" to an epoch
+
+  Args:
+    arg: (str) time in one of the TIME_ARGUMENT_FORMATS
+
+  Returns:
+    (float) epoch in s
+
+  Raises:
+    None, exits if the time cannot be understood
+  """
+  import time
+
+  for timeFormat in TIME_ARGUMENT_FORMATS:
+    try:
+      return time.mktime( time.strptime( arg, timeFormat))
+    except ValueError:
+      pass
+  print "Cannot understand the time '" + arg + "'"
+  print errorMessage
+  sys.exit(2)
 
 
 def updateLongWaterLevel( tick):
@@ -276,7 +359,7 @@ def updateLongWaterLevel( tick):
 
   longAve = longWaterLevelAve.average
   print "{0:%Y-%m-%dT%H:%M:%S.%f-0400 updateLongWaterLevels {1}}"\
-          .format( datetime.datetime.fromtimestamp(tick),
+          .format( mainClock.datetime( tick),
                    ifx.influxWrites)
   ifx.reset()
   longWaterLevels.append( longAve)
@@ -381,7 +464,7 @@ def levelWeeklyReport( currentTime):
   Raises:
     None
   """
-  if datetime.datetime.fromtimestamp(currentTick).weekday == 0:
+  if mainClock.datetime( currentTime).weekday() == 0:
     levelWeeklyHighLow.report( currentTime, outChan)
     levelWeeklyHighLow.reset()
 
@@ -400,7 +483,7 @@ def levelMonthlyReport( currentTime):
     None
   """
 
-  if datetime.datetime.fromtimestamp(currentTick).day == 1:
+  if mainClock.datetime( currentTime).day == 1:
     levelMonthlyHighLow.report( currentTime, outChan)
     levelMonthlyHighLow.reset()
 
@@ -417,10 +500,20 @@ def waveUpdate( tick):
     Raises:
       None
     """
-    tuple = dominantWave.value()
-    ifx.sendPoint( currentTick, "dominantWave", "period", tuple[0])
-    ifx.sendPoint( currentTick, "dominantWave", "peak", tuple[1])
-    ifx.sendPoint( currentTick, "dominantWave", "power", tuple[2])
+    for horizon, tuple in dominantWave.values( tick):
+        if tuple is None: # no waves lately
+            continue
+        if horizon == DOMINANT_WAVE_PERIOD:
+            ifx.sendPoint( currentTick, "dominantWave", "period", tuple[0])
+            ifx.sendPoint( currentTick, "dominantWave", "peak", tuple[1])
+            ifx.sendPoint( currentTick, "dominantWave", "power", tuple[2])
+        if horizon in DOMINANT_WAVE_HORIZONS:
+            ifx.sendTaggedPoint( currentTick, "dominantWave", "horizon",
+                                 horizon, "period", tuple[0])
+            ifx.sendTaggedPoint( currentTick, "dominantWave", "horizon",
+                                 horizon, "peak", tuple[1])
+            ifx.sendTaggedPoint( currentTick, "dominantWave", "horizon",
+                                 horizon, "power", tuple[2])
 
 def waveHourlyReport( tick):
   """report on the waves in the past hour
@@ -471,12 +564,20 @@ def doFFTs( currentTime):
   Raises:
     None
   """
-  waveLengthSamples.fft()
-  periodSamples.fft()
+  if spectrumHistory is None:
+    resamples.batchFft( waveLengthSamples.resamples +
+                        periodSamples.resamples)
+  else:
+    waveLengthSamples.fft()
+    periodSamples.fft()
 
   #sendAllFftSamples( currentTime)
   sendLimitedFftSamples( currentTime)
 
+  if waveSpectrogram is not None:
+    for frameTick, amplitudes in waveSpectrogram.process( currentTime):
+      sendSpectrogramFrame( frameTick, amplitudes)
+
   waveLengthSamples.freshen()
   periodSamples.freshen()
 
@@ -516,6 +617,29 @@ def sendAllFftSamples( tick):
 
 
 
+def sendSpectrogramFrame( tick, amplitudes):
+  """send a spectrogram frame to the InfluxDB server
+
+  Args:
+    tick: (float) epoch in s at the end of the frame
+    amplitudes: (float array) inches for each frequency of the frame
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  frequency, amplitude = waveSpectrogram.peak( amplitudes)
+  ifx.sendTaggedPoint( tick, "spectrogram", "period", 1. / frequency,
+                       "peakAmplitude", amplitude)
+  if SEND_SPECTROGRAM:
+    for frequency, amplitude in zip( waveSpectrogram.frequencies[ 1:].tolist(),
+                                     amplitudes[ 1:].tolist()):
+      ifx.sendTaggedPoint( tick, "spectrogram", "period", 1. / frequency,
+                           "amplitude", amplitude)
+
+
 def sendLimitedFftSamples(tick):
   """send limited FFT samples to the InfluxDB server
 
@@ -536,24 +660,26 @@ def sendLimitedFftSamples(tick):
   periodResponse = 0
   period = 0
 
-  # find the dominant response by wavelength
-  for sample in waveLengthSamples.resamples:
-    if sample.response is not None:
-      if sample.response > waveLengthResponse:
-        waveLengthResponse = sample.response
-        waveLength = sample.waveLength
-      # waveLength = sample.waveLength
-
-  # find the dominant response by period
-  # for sample in periodSamples.resamples:
-  #   if sample.response is not None:
-  #     if sample.response > periodResponse:
-  #       periodResponse = sample.response
-  #     period = sample.cyclePeriod
+  # find the dominant response by wavelength, between the boat lengths
+  cyclePeriod, response = peakfit.findPeak( waveLengthSamples.resamples)
+  if cyclePeriod is not None:
+    waveLengthResponse = response
+    waveLength = peakfit.waveLength( cyclePeriod)
 
   ifx.sendTaggedPoint( tick, "spectrum", "waveLength", waveLength,
                        "waveLengthResponse", waveLengthResponse)
 
+  # find the dominant response by period, affordable with the shared
+  # or multirate spectrum
+  if spectrumHistory is not None:
+    cyclePeriod, response = peakfit.findPeak( periodSamples.resamples)
+    if cyclePeriod is not None:
+      periodResponse = response
+      period = cyclePeriod
+
+    ifx.sendTaggedPoint( tick, "spectrum", "period", period,
+                         "periodResponse", periodResponse)
+
 
 #### MAIN ####
 
@@ -576,12 +702,16 @@ def main():
 
   global outChan
   global currentTick
+  global mainClock
   global mainSched
+  global ifx
   global findWake
 
   global dominantWave
   global waveLengthSamples
   global periodSamples
+  global spectrumHistory
+  global waveSpectrogram
 
   global longWaterLevelAve
   global longWaterLevelStats
@@ -602,16 +732,31 @@ def main():
 
 
   # initialze the input and output streams
-  inputFileName, outputFileBaseName = processCommandLineArguments()
+  options = processCommandLineArguments()
 
-  inChan = inputchan.InputChannel( inputFileName)
+  if options['inputFileName'] == '-S': # live sensors
+    mainClock = clock.Clock( clock.LIVE_CLOCK)
+  elif options['speed'] is None:
+    mainClock = clock.Clock( clock.FAST_CLOCK)
+  else:
+    mainClock = clock.Clock( clock.PACED_CLOCK, options['speed'])
+  mainSched = mysched.Schedule( mainClock)
+  ifx = influx.Influx( INFLUXDB_DATABASE, mainClock)
+
+  inChan = inputchan.InputChannel( options['inputFileName'],
+                                   options['recordFileName'],
+                                   options['startTick'],
+                                   options['endTick'],
+                                   options['processes'],
+                                   mainClock)
   if not inChan.success:
     print errorMessage
     sys.exit(1)
   openFileHandles = []
   openFileHandles.append( inChan)
 
-  outChan = report.ReportChannel( outputFileBaseName)
+  outChan = report.ReportChannel( options['outputFileBaseName'],
+                                  reportClock=mainClock)
   #outChan = report.ReportChannel( "")
   openFileHandles.append( outChan)
 
@@ -623,7 +768,8 @@ def main():
   currentTick, currentLevel = inChan.getWaterLevel( currentTick)
 
   findWave = findwave.FindWave() # determine wave peaks and periods
-  dominantWave = dominant.Dominant( DOMINANT_WAVE_PERIOD) # determine dominant wave
+  dominantWave = dominant.MultiDominant( # determine dominant waves
+    [DOMINANT_WAVE_PERIOD] + DOMINANT_WAVE_HORIZONS)
 
   instantWaveHeight = 0
   longWaterLevels = []
@@ -656,7 +802,30 @@ def main():
   wavePowerStats = stats.Stats( "Wave Power", "nw/ft?", 20)
   findWake = findwake.FindWake( outChan, mainSched, ifx)
 
-  waveLengthSamples = resamples.Resamples()
+  longestPeriod = max( TARGET_PERIODS + [
+    math.sqrt( 2 * math.pi * waveLength / GRAVITY_CONSTANT)
+    for waveLength in BOAT_LENGTHS])
+  if SPECTRUM_ENGINE == SHARED_SPECTRUM:
+    spectrumHistory = spectrum.SpectrumHistory(
+      MINIMUM_NUMBER_OF_CYCLES * longestPeriod)
+    waveLengthSamples = spectrum.Spectrum( spectrumHistory)
+    periodSamples = spectrum.Spectrum( spectrumHistory)
+  elif SPECTRUM_ENGINE == ZOOM_SPECTRUM:
+    spectrumHistory = spectrum.SpectrumHistory(
+      MINIMUM_NUMBER_OF_CYCLES * longestPeriod)
+    waveLengthSamples = zoom.ZoomSpectrum( spectrumHistory)
+    periodSamples = zoom.ZoomSpectrum( spectrumHistory)
+  elif SPECTRUM_ENGINE == MULTIRATE_SPECTRUM:
+    spectrumHistory = multirate.DecimatorBank( longestPeriod)
+    waveLengthSamples = multirate.MultirateSpectrum( spectrumHistory)
+    periodSamples = multirate.MultirateSpectrum( spectrumHistory)
+  else:
+    waveLengthSamples = resamples.Resamples()
+    periodSamples = resamples.Resamples()
+
+  if SPECTROGRAM:
+    waveSpectrogram = spectrogram.Spectrogram()
+
   for waveLength in BOAT_LENGTHS:
     waveSpeed = math.sqrt (GRAVITY_CONSTANT * waveLength / 2 /math.pi)
         # ft/s
@@ -669,18 +838,25 @@ def main():
       waveSpeed)
     #pylint: enable=E1305
 
-    waveLengthSamples.resamples.append(
-      resamples.Resample( cyclePeriod, currentTick, instantWaveHeight))
+    if spectrumHistory is None:
+      waveLengthSamples.resamples.append(
+        resamples.Resample( cyclePeriod, currentTick, instantWaveHeight))
+    else:
+      waveLengthSamples.resamples.append( spectrum.SpectrumBand( cyclePeriod))
     waveLengthSamples.resamples[-1].waveLength = waveLength # sort of a cheat...
 
-  periodSamples = resamples.Resamples()
   for period in TARGET_PERIODS:
-    periodSamples.resamples.append(
-      resamples.Resample( period, currentTick, instantWaveHeight))
+    if spectrumHistory is None:
+      periodSamples.resamples.append(
+        resamples.Resample( period, currentTick, instantWaveHeight))
+    else:
+      periodSamples.resamples.append( spectrum.SpectrumBand( period))
 
 
   ## MAIN schedule periodic tasks
 
+  # all SKIP_MISSED, the default: after a gap the reports cover the time
+  # since the last one and the spectra only the latest waves anyway
   mainSched.schedule( updateLongWaterLevel, currentTick, EVERY_MINUTE, 0)
   mainSched.schedule( waveUpdate, currentTick, EVERY_MINUTE, 0)
   mainSched.schedule( doFFTs, currentTick, EVERY_200_MSEC, 0)
@@ -701,63 +877,85 @@ def main():
 
   ###MAIN LOOP
 
-  #for _ in range (0, 3*60*60*30): #200000000): # limited test run
-  while True: # until stopped...
-    lastTick = currentTick
-    lastWaveHeight = instantWaveHeight
-    currentTick, currentLevel = inChan.getWaterLevel( currentTick)
-    #currentTick, currentLevel = inChan.readLevel( currentTick)
-    if SEND_RAW_MEASUREMENTS:
-      ifx.sendPoint( currentTick, "rawWaterLevel", "waterLevel", currentLevel)
-
-    longWaterLevelAve.update( currentLevel)
-    waveBaseLine = medWaterLevelAve.update( currentLevel)
-    if SEND_RAW_MEASUREMENTS:
-      ifx.sendPoint( currentTick, "waterLevel",
-                     "waveBaseLine", waveBaseLine)
-
-    instantWaveHeight = currentLevel - waveBaseLine
-    if SEND_RAW_WAVES:
-      ifx.sendPoint( currentTick, "waterLevel",
-                     "waveHeight", instantWaveHeight)
-
-    waveHeightTrap.update( currentTick, instantWaveHeight)
-
-    filteredWaveHeight = waveHeightLowPass.update( instantWaveHeight)
-    if SEND_RAW_MEASUREMENTS:
-      ifx.sendPoint( currentTick, "waterLevel",
-                     "filteredWaveHeight", filteredWaveHeight)
-    if findWave.findWave( currentTick, filteredWaveHeight):
-      peak = findWave.wavePeakToPeak
-      period = findWave.wavePeriod
-      power = findWave.wavePower
-      dtd = datetime.datetime.fromtimestamp( currentTick)
-      print "  findWave {:%H:%M:%S}.{:02d} per:{:.2f} pk:{:.2f} pow:{:.2f}".format(\
-              dtd, dtd.microsecond/10000, period, peak, power)
-      ifx.sendPoint( currentTick, "wave", "peak", peak)
-      ifx.sendPoint( currentTick, "wave", "period", period)
-      ifx.sendPoint( currentTick, "wave", "power", power)
-      dominantWave.update( currentTick, period, peak, power)
-
-      waveHeightHourlyHighLow.update( peak)
-      waveHeightDailyHighLow.update( peak)
-      waveHeightWeeklyHighLow.update( peak)
-      waveHeightMonthlyHighLow.update( peak)
-
-      wavePowerStats.update( power)
-      wavePeakStats.update( peak)
-      findWake.update( currentTick, period, peak, power)
-
-
-    # resample raw wave for spectral analysis
-    waveLengthSamples.evaluate ( currentTick, instantWaveHeight,
-                                 lastTick, lastWaveHeight)
-    # periodSamples.evaluate ( currentTick, instantWaveHeight,
-    #                          lastTick, lastWaveHeight)
-
-# do the timed jobs that are due
-    # print "mainSched.execute", currentTick
-    mainSched.execute(currentTick)
+  # measurements are put on an exact grid a block at a time
+  regridder = regrid.Regrid()
+  for ticks, levels in inChan.blocks( INPUT_BLOCK_SIZE):
+    gridTicks, gridLevels, starts = regridder.update( ticks, levels)
+    starts = set( starts.tolist())
+    for i in xrange( len( gridTicks)):
+      lastTick = currentTick
+      lastWaveHeight = instantWaveHeight
+      currentTick = float( gridTicks[i])
+      currentLevel = float( gridLevels[i])
+      mainClock.advance( currentTick)
+      if SEND_RAW_MEASUREMENTS:
+        ifx.sendPoint( currentTick, "rawWaterLevel", "waterLevel",
+                       currentLevel)
+
+      longWaterLevelAve.update( currentLevel)
+      waveBaseLine = medWaterLevelAve.update( currentLevel)
+      if SEND_RAW_MEASUREMENTS:
+        ifx.sendPoint( currentTick, "waterLevel",
+                       "waveBaseLine", waveBaseLine)
+
+      instantWaveHeight = currentLevel - waveBaseLine
+      if SEND_RAW_WAVES:
+        ifx.sendPoint( currentTick, "waterLevel",
+                       "waveHeight", instantWaveHeight)
+
+      waveHeightTrap.update( currentTick, instantWaveHeight)
+
+      filteredWaveHeight = waveHeightLowPass.update( instantWaveHeight)
+      if SEND_RAW_MEASUREMENTS:
+        ifx.sendPoint( currentTick, "waterLevel",
+                       "filteredWaveHeight", filteredWaveHeight)
+      if findWave.findWave( currentTick, filteredWaveHeight):
+        peak = findWave.wavePeakToPeak
+        period = findWave.wavePeriod
+        power = findWave.wavePower
+        dtd = mainClock.datetime( currentTick)
+        print "  findWave {:%H:%M:%S}.{:02d} per:{:.2f} pk:{:.2f} pow:{:.2f}".format(\
+                dtd, dtd.microsecond/10000, period, peak, power)
+        ifx.sendPoint( currentTick, "wave", "peak", peak)
+        ifx.sendPoint( currentTick, "wave", "period", period)
+        ifx.sendPoint( currentTick, "wave", "power", power)
+        dominantWave.update( currentTick, period, peak, power)
+
+        waveHeightHourlyHighLow.update( peak)
+        waveHeightDailyHighLow.update( peak)
+        waveHeightWeeklyHighLow.update( peak)
+        waveHeightMonthlyHighLow.update( peak)
+
+        wavePowerStats.update( power)
+        wavePeakStats.update( peak)
+        findWake.update( currentTick, period, peak, power)
+
+
+      # resample raw wave for spectral analysis
+      if spectrumHistory is not None: # both spectra at once
+        if i in starts: # after a gap in the measurements
+          spectrumHistory.reset()
+        spectrumHistory.update( instantWaveHeight)
+      elif i in starts: # after a gap in the measurements
+        waveLengthSamples.reset( currentTick, instantWaveHeight)
+        # periodSamples.reset( currentTick, instantWaveHeight)
+      else:
+        waveLengthSamples.evaluate ( currentTick, instantWaveHeight,
+                                     lastTick, lastWaveHeight)
+        # periodSamples.evaluate ( currentTick, instantWaveHeight,
+        #                          lastTick, lastWaveHeight)
+      if waveSpectrogram is not None:
+        if i in starts:
+          waveSpectrogram.reset()
+        waveSpectrogram.update( instantWaveHeight)
+
+      # do the timed jobs that are due
+      # print "mainSched.execute", currentTick
+      mainSched.execute(currentTick)
+
+  inChan.close()
+  print "\nExiting at end of input file."
+  sys.exit(1)
 
   #pylint: enable=too-many-statements
   #pylint: enable=global-statement
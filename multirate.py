@@ -0,0 +1,425 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+multirate -- module for octave spaced streams of wave heights
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+This is the MULTIRATE_SPECTRUM engine. A decimator bank passes the wave
+heights through a cascade of half band decimators, each filtering out the
+upper half of its input band and keeping every other value. Octave 0 is the
+wave heights themselves, octave 1 is at half the rate, octave 2 at a quarter
+and so on. Each octave keeps a short history of its values.
+
+A band is analyzed in the octave with the lowest rate that still has at
+least MULTIRATE_SAMPLES_PER_CYCLE values per cycle, so every band looks at
+about the same number of values no matter how long its period. A 19.2 s
+period needs a few dozen values instead of the thousands of the resamples.
+Unlike the linear interpolation of the resamples, the half band filters keep
+the shorter waves from aliasing into the longer periods.
+
+Values are held back until the responses are needed and then filtered a
+block at a time. The filters are symmetric, so their delay does not change
+the size of a response. What they do to the size is taken out of the scale
+of each band by the gain() of its octave.
+
+The bank stands in for a spectrum.SpectrumHistory and a multirate spectrum
+for a spectrum.Spectrum, so main uses them the same way.
+"""
+
+
+#### IMPORTS ####
+
+import math
+
+import numpy as np
+
+import ringbuffer
+import spectrum
+from config import DESIRED_PERIOD
+from config import MINIMUM_NUMBER_OF_CYCLES
+from config import MULTIRATE_SAMPLES_PER_CYCLE
+
+
+#### CONSTANTS ####
+
+HALF_BAND_TAPS = 15 # taps in each half band filter, 3 more than a multiple of 4
+
+
+#### CLASSES ####
+
+class HalfBandDecimator (object):
+  """filter out the upper half of the band and keep every other value
+
+  attributes:
+    taps: (float array) filter coefficients, every other one zero
+  """
+
+  def __init__ (self, length=HALF_BAND_TAPS):
+    """Design a half band filter as a Hamming windowed sinc.
+
+    Args:
+      length: (int) optional number of taps
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    n = np.arange( length) - ( length - 1) / 2
+    self.taps = 0.5 * np.sinc( n / 2.) * np.hamming( length)
+    self.taps = self.taps / self.taps.sum()
+    self._tail = np.empty( 0) # inputs still needed by the next outputs
+    self._offset = 0 # filter output where the next kept value is
+
+
+  def gain (self, frequency, period):
+    """Get the amplitude gain of the filter at a frequency.
+
+    Args:
+      frequency: (float) Hz
+      period: (float) s between input values
+
+    Returns:
+      (float) ratio of the output amplitude to the input amplitude
+
+    Raises:
+      None
+    """
+    omega = 2 * math.pi * frequency * period # radians per input value
+    return abs( np.dot( self.taps,
+                        np.exp( -1j * omega * np.arange( len( self.taps)))))
+
+
+  def process (self, values):
+    """Filter and decimate a block of values.
+
+    Args:
+      values: (float array) input values, continuing the previous block
+
+    Returns:
+      (float array) output values at half the rate
+
+    Raises:
+      None
+    """
+    data = np.concatenate(( self._tail, values))
+    count = len( data) - len( self.taps) + 1 # complete filter outputs
+    if count <= 0:
+      self._tail = data
+      return np.empty( 0)
+    kept = np.convolve( data, self.taps, "valid")[ self._offset::2]
+    self._offset = ( self._offset - count) % 2
+    self._tail = data[ count:]
+    return kept
+
+
+  def reset (self):
+    """Start over, as after a gap in the measurements."""
+    self._tail = np.empty( 0)
+    self._offset = 0
+
+
+
+class Octave (object):
+  """history of one octave spaced stream
+
+  attributes:
+    number: (int) octave number, 0 for the wave heights themselves
+    period: (float) s between history values
+    levels: ringbuffer.RingBuffer of the latest history values
+    decimators: list of the HalfBandDecimator objects in front of the octave
+  """
+
+  def __init__ (self, number, capacity, decimators):
+    """Initialize an empty octave.
+
+    Args:
+      number: (int) octave number
+      capacity: (int) history values to keep
+      decimators: list of the HalfBandDecimator objects in front of it
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.number = number
+    self.period = DESIRED_PERIOD * 2 ** number
+    self.levels = ringbuffer.RingBuffer( capacity)
+    self.decimators = decimators
+
+
+  def gain (self, frequency):
+    """Get the amplitude gain of the decimators at a frequency.
+
+    Args:
+      frequency: (float) Hz
+
+    Returns:
+      (float) ratio of the history amplitude to the wave height amplitude
+
+    Raises:
+      None
+    """
+    gain = 1.
+    for stage, decimator in enumerate( self.decimators):
+      gain = gain * decimator.gain( frequency, DESIRED_PERIOD * 2 ** stage)
+    return gain
+
+
+
+class DecimatorBank (object):
+  """cascade of half band decimators making octave spaced streams
+
+  attributes:
+    octaves: list of Octave objects, fastest first
+  """
+
+  def __init__ (self, longestPeriod):
+    """Initialize a bank with enough octaves for the longest period.
+
+    Args:
+      longestPeriod: (float) s of the longest cycle period to be analyzed
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    count = 1
+    while longestPeriod / ( DESIRED_PERIOD * 2 ** count) >= \
+        MULTIRATE_SAMPLES_PER_CYCLE:
+      count = count + 1
+    decimators = [HalfBandDecimator() for _ in range( count - 1)]
+    capacity = int( math.ceil( 2 * MINIMUM_NUMBER_OF_CYCLES *
+                               MULTIRATE_SAMPLES_PER_CYCLE))
+    self.octaves = []
+    for number in range( count):
+      if number == count - 1: # the slowest takes whatever is left over
+        capacity = max( capacity, int( math.ceil(
+          MINIMUM_NUMBER_OF_CYCLES * longestPeriod /
+          ( DESIRED_PERIOD * 2 ** number))))
+      self.octaves.append( Octave( number, capacity, decimators[ :number]))
+    self._pending = []
+
+
+  def octaveFor (self, cyclePeriod):
+    """Find the octave to analyze a cycle period in.
+
+    Args:
+      cyclePeriod: (float) period of cycle in s
+
+    Returns:
+      Octave with the lowest rate and enough values per cycle
+
+    Raises:
+      None
+    """
+    number = 0
+    while number + 1 < len( self.octaves) and \
+        cyclePeriod / self.octaves[ number + 1].period >= \
+        MULTIRATE_SAMPLES_PER_CYCLE:
+      number = number + 1
+    return self.octaves[ number]
+
+
+  def update (self, value):
+    """Add a wave height.
+
+    Args:
+      value: (float) wave height in inches
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self._pending.append( value)
+
+
+  def updateBlock (self, values):
+    """Add a block of wave heights.
+
+    Args:
+      values: (float array) wave heights in inches
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self._pending.extend( np.asarray( values, dtype=np.float64).tolist())
+
+
+  def flush (self):
+    """Pass the pending wave heights through the cascade.
+
+    Args:
+      None
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    if not self._pending:
+      return
+    values = np.array( self._pending, dtype=np.float64)
+    self._pending = []
+    for octave in self.octaves:
+      if len( values) == 0:
+        break
+      if octave.number > 0:
+        values = octave.decimators[-1].process( values)
+      octave.levels.extend( values)
+
+
+  def reset (self):
+    """Start the streams over, as after a gap in the measurements."""
+    self._pending = []
+    for octave in self.octaves:
+      octave.levels.clear()
+      for decimator in octave.decimators[ -1:]:
+        decimator.reset()
+
+
+
+class MultirateSpectrum (object):
+  """responses of a list of bands, each from its nearest octave
+
+  attributes:
+    bank: DecimatorBank of the wave heights
+    resamples: list of spectrum.SpectrumBand objects
+  """
+
+  def __init__ (self, bank):
+    """Initialize a spectrum with no bands.
+
+    Args:
+      bank: DecimatorBank shared with other spectra
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.bank = bank
+    self.resamples = []
+    self._spectra = None
+    self._bandCount = 0
+
+
+  def fft (self):
+    """Find the responses of all bands with enough history.
+
+    Args:
+      None
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.bank.flush()
+    if self._spectra is None or self._bandCount != len( self.resamples):
+      self._build()
+    for octaveSpectrum in self._spectra:
+      octaveSpectrum.fft()
+
+
+  def freshen (self):
+    """nothing to release, the octaves only keep what they need."""
+    pass
+
+
+  def _build (self):
+    """sort the bands into a spectrum for each octave they use"""
+    spectra = {}
+    for band in self.resamples:
+      octave = self.bank.octaveFor( band.cyclePeriod)
+      if octave.number not in spectra:
+        spectra[ octave.number] = spectrum.Spectrum( octave)
+      spectra[ octave.number].resamples.append( band)
+    self._spectra = [spectra[ number] for number in sorted( spectra)]
+    self._bandCount = len( self.resamples)
+
+
+#### FUNCTIONS ####
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  import time
+
+  periods = [1., 2., 3., 4., 19.2]
+  bank = DecimatorBank( max( periods))
+  multirate = MultirateSpectrum( bank)
+  for period in periods:
+    multirate.resamples.append( spectrum.SpectrumBand( period))
+  for octave in bank.octaves:
+    print "octave {0} every {1:.3f} s keeps {2}".format(
+      octave.number, octave.period, octave.levels.capacity)
+  ticks = np.arange( 0, 120, DESIRED_PERIOD)
+  heights = np.sin( 2 * math.pi * ticks / 3.) + 0.5 * np.sin(
+    2 * math.pi * ticks / 19.2)
+  bank.updateBlock( heights[ :7]) # the slow octaves are still empty
+  multirate.fft()
+  print "after 7 values:", [ band.response for band in multirate.resamples]
+  bank.reset()
+  for first in range( 0, len( heights), 100): # blocks of uneven size
+    bank.updateBlock( heights[ first:first + 100])
+    bank.flush()
+  start = time.time()
+  for _ in range( 100):
+    multirate.fft()
+  print "fft in {0:.6f} s".format(( time.time() - start) / 100)
+  for band in multirate.resamples:
+    print "period {0:5.1f} octave {1} response {2:8.1f}".format(
+      band.cyclePeriod, bank.octaveFor( band.cyclePeriod).number,
+      band.response)
+  print "expected for 1 in", spectrum.BUFFER_SIZE / 2
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
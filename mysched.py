@@ -23,10 +23,53 @@ AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
 LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
+
+
+#### NOTES ####
+
+The tasks are kept in a heap ordered by due tick, and by the order they
+were scheduled for tasks due at the same tick. Checking for due tasks on
+every measurement only looks at the top of the heap, and scheduling a task
+takes log time.
+
+A task is unscheduled by dropping it from the tasks by process ID, which
+takes constant time. Its entry stays in the heap and is skipped when it
+comes to the top. When the heap holds more unscheduled entries than tasks,
+it is rebuilt without them.
+
+When execute() finds tasks due, it takes all of the tasks due at the
+earliest tick as a batch, runs them in the order they were scheduled, and
+then reschedules them, until no more are due. A task rescheduled by its own
+batch cannot run again in it.
+
+After a gap in the measurements, or a stall, a recurring task may have
+missed several periods. What happens then is its policy:
+
+  SKIP_MISSED      run once with the current tick, as if nothing was missed
+  COALESCE_MISSED  run once with the current tick and the number of periods
+                   missed before this one, as function( tick, missed)
+  REPLAY_MISSED    run once for each missed period with the tick it was due,
+                   in turn with the other tasks, then once with the current
+                   tick
+
+After running with the current tick, a recurring task is due again at the
+next period after that tick.
 """
 
 #### IMPORTS ####
 
+import heapq
+import math
+
+import clock
+
+
+#### CONSTANTS ####
+
+SKIP_MISSED = "skip"
+COALESCE_MISSED = "coalesce"
+REPLAY_MISSED = "replay"
+
 
 #### CLASSES ####
 
@@ -45,27 +88,54 @@ class Schedule (object):
     None
   """
 
-  def __init__ (self):
-    self.tasks = []
+  def __init__ (self, taskClock=None):
+    """Initialize a schedule.
+
+    Args:
+      taskClock: (clock.Clock) optional clock giving the current time when
+        execute() is not given one, a live clock by default
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
     self.processID = 1
+    if taskClock is None:
+      taskClock = clock.Clock()
+    self.clock = taskClock
+    self._heap = [] # [due, processID, task] entries
+    self._live = {} # scheduled tasks by processID
+
+
+  @property
+  def tasks (self):
+    """the scheduled tasks in the order they will be executed"""
+    return [entry[2] for entry in sorted( self._heap)
+            if self._live.get( entry[2]['processID']) is entry[2]]
 
 
-  def schedule (self, function, tick, period, offset=0):
+  def schedule (self, function, tick, period, offset=0, policy=SKIP_MISSED):
     """schedule a task for future execution
   
     Args:
-      function: (addr) parameterless function to be executed
+      function: (addr) function to be executed, given the current tick
       tick: (float) the current epoch in seconds
       period: (int) how often the task is to be executed in seconds,
               set to 0 for non-recurring tasks
       offset: (int) optional offset s after the period for execution
+      policy: optional SKIP_MISSED, COALESCE_MISSED or REPLAY_MISSED for
+              periods missed by a recurring task
     
     Returns:
       processID assigned
     
     Raises:
-      None
+      ValueError if the policy is unknown
     """
+    if policy not in ( SKIP_MISSED, COALESCE_MISSED, REPLAY_MISSED):
+      raise ValueError( "Unknown schedule policy " + str( policy))
   
     self.processID = self.processID + 1
     if period == 0: # one time scheduling, just use the offset
@@ -73,15 +143,16 @@ class Schedule (object):
     else:
       due = nextDue ( tick, period, offset)
 
-    # print "Schedule.schedule scheduling due:", due, tick, function, self.processID, period, offset
-    self.tasks.append ( {
+    task = {
       'processID': self.processID,
       'function':  function,
       'period':    period,
       'offset':    offset,
+      'policy':    policy,
       'due':       due
-    })
-    # print self.tasks
+    }
+    self._live[ self.processID] = task
+    self._push( task)
     return self.processID
 
 
@@ -97,22 +168,19 @@ class Schedule (object):
     Raises:
       None
     """
-    #print "unschedule, processID is type: ", type(processID), processID,
-    #    self.tasks
-    #print "unschedule: ", processID
-    #print self.tasks
-    for i, task in enumerate( self.tasks):
-      if processID == task['processID']:
-        #print "popping", i
-        self.tasks.pop( i)
-        break
-    #print self.tasks
-
-  def execute(self, tick):
+    if self._live.pop( processID, None) is not None and \
+        len( self._heap) > 2 * len( self._live) + 16:
+      self._heap = [entry for entry in self._heap
+                    if self._live.get( entry[2]['processID']) is entry[2]]
+      heapq.heapify( self._heap)
+
+
+  def execute(self, tick=None):
     """Execute timed tasks that are due.
 
     Args:
-      tick: (float) current time as epoch seconds
+      tick: (float) optional current time as epoch seconds, the time of the
+        schedule's clock if not given
   
     Returns:
       None
@@ -120,22 +188,55 @@ class Schedule (object):
     Raises:
       None
     """
-    for i, task in enumerate( self.tasks):
-      if tick > task['due']:
-        #print "execute popping", i, self.tasks
-        dueTask = self.tasks.pop(i)
-        # print "dueTask",dueTask, dueTask['function']
-        if dueTask['function'] is not None:
-          dueTask['function']( tick) # execute the task
-          if dueTask['period'] > 0: # recurring task
-            due = nextDue (tick, dueTask['period'], dueTask['offset'])
-            self.tasks.append ( {
-              'processID': dueTask['processID'],
-              'function':  dueTask['function'],
-              'period':    dueTask['period'],
-              'offset':    dueTask['offset'],
-              'due':       due
-            })
+    if tick is None:
+      tick = self.clock.now()
+    heap = self._heap
+    while heap and tick > heap[0][0]:
+      due = heap[0][0]
+      batch = []
+      while heap and heap[0][0] == due:
+        task = heapq.heappop( heap)[2]
+        if self._live.get( task['processID']) is task: # not unscheduled
+          batch.append( task)
+      for task in batch:
+        if self._live.get( task['processID']) is task: # still scheduled
+          self._run( task, tick)
+      for task in batch:
+        if self._live.get( task['processID']) is not task:
+          continue # unscheduled by the batch
+        if task['period'] > 0: # recurring task
+          self._push( task)
+        else:
+          del self._live[ task['processID']]
+
+
+  def _run (self, task, tick):
+    """run a due task by its policy and work out when it is due next"""
+    period = task['period']
+    due = task['due']
+    function = task['function']
+    if period > 0 and task['policy'] == REPLAY_MISSED and \
+        tick > due + period: # a missed period, replayed on its own
+      task['due'] = due + period
+      if function is not None:
+        function( due)
+      return
+    if period > 0:
+      task['due'] = nextDue( tick, period, task['offset'])
+    if function is None:
+      return
+    if task['policy'] == COALESCE_MISSED:
+      missed = 0
+      if period > 0:
+        missed = max( 0, int( math.ceil(( tick - due) / float( period))) - 1)
+      function( tick, missed)
+    else:
+      function( tick) # execute the task
+
+
+  def _push (self, task):
+    """add a task to the heap at its due tick"""
+    heapq.heappush( self._heap, [task['due'], task['processID'], task])
  
 
 #### FUNCTIONS ####
@@ -173,6 +274,7 @@ def test():
   Tick:  6
   hi
   hello
+  one time event
   Tick:  7
   Tick:  8
   hi
@@ -196,8 +298,21 @@ def test():
   Tick:  18
   hi
   hi there
-  Tick:  19 
-
+  Tick:  19
+  Tick:  5
+  Tick:  11
+  replayed 11
+  coalesced 11 missed 0
+  Tick:  47
+  replayed 20
+  coalesced 47 missed 2
+  replayed 30
+  replayed 47
+  Tick:  55
+  replayed 55
+  coalesced 55 missed 0
+  Tick:  6
+  cancelling 3
 
   Args:
     None
@@ -209,22 +324,22 @@ def test():
     None
   """
 
-  def test1():
+  def test1( tick):
     """Test routine
     """
     print "hi"
   
-  def test2():
+  def test2( tick):
     """Test routine
     """
     print "hello"
   
-  def test3():
+  def test3( tick):
     """Test routine
     """
     print "hi there"
   
-  def test4():
+  def test4( tick):
     """Test routine
     """
     print "one time event"
@@ -240,6 +355,35 @@ def test():
     print "Tick: ", currentTick
     testSched.execute( currentTick)
 
+  def replayed( tick):
+    """Test routine
+    """
+    print "replayed", tick
+
+  def coalesced( tick, missed):
+    """Test routine
+    """
+    print "coalesced", tick, "missed", missed
+
+  gapSched = Schedule ()
+  gapSched.schedule (replayed, 0, 10, 0, REPLAY_MISSED)
+  gapSched.schedule (coalesced, 0, 10, 0, COALESCE_MISSED)
+  for currentTick in [5, 11, 47, 55]: # a gap from 11 to 47
+    print "Tick: ", currentTick
+    gapSched.execute( currentTick)
+
+  def cancelling( tick):
+    """Test routine
+    """
+    print "cancelling", cancelledID
+    batchSched.unschedule( cancelledID)
+
+  batchSched = Schedule ()
+  batchSched.schedule (cancelling, 0, 0, 5)
+  cancelledID = batchSched.schedule (test4, 0, 0, 5) # should not run
+  print "Tick: ", 6
+  batchSched.execute( 6)
+
 
 if __name__ == "__main__":
   test()
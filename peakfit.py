@@ -0,0 +1,182 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+peakfit -- module for the peak of a spectrum between its bands
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+The largest response of a set of bands only says which band is closest to
+the peak of the spectrum. Fitting a curve through the largest response and
+the responses of the bands on either side of it gives a peak anywhere
+between them, so a coarse set of bands can still give a close estimate.
+
+The bands do not need to be equally spaced. The fit is done against the
+frequency of the bands, where a peak is close to symmetric. There are two
+curves:
+
+  QUADRATIC_PEAK  a parabola through the three responses
+  GAUSSIAN_PEAK   a parabola through the logs of the three responses, which
+                  follows the shape of a windowed peak more closely
+
+A peak at the first or last band, or next to a band without a response,
+cannot be fitted and is given as is. The fitted frequency is kept between
+the neighboring bands.
+
+The wave length of a period is that of a deep water wave.
+"""
+
+
+#### IMPORTS ####
+
+import math
+
+from config import GAUSSIAN_PEAK
+from config import GRAVITY_CONSTANT
+from config import PEAK_INTERPOLATION
+from config import QUADRATIC_PEAK
+
+
+#### FUNCTIONS ####
+
+def vertex (xs, ys):
+  """Find the vertex of the parabola through three points.
+
+  Args:
+    xs: three (float) positions, increasing
+    ys: three (float) values at the positions
+
+  Returns:
+    x: (float) position of the vertex, None if the points are on a line
+    y: (float) value at the vertex
+
+  Raises:
+    None
+  """
+  x0, x1, x2 = xs
+  y0, y1, y2 = ys
+  slope01 = ( y1 - y0) / ( x1 - x0)
+  slope12 = ( y2 - y1) / ( x2 - x1)
+  curvature = ( slope12 - slope01) / ( x2 - x0)
+  if curvature == 0:
+    return None, y1
+  slope = slope01 - curvature * ( x1 - x0) # at x0
+  x = x0 - slope / ( 2 * curvature)
+  return x, y0 + ( x - x0) * ( slope + curvature * ( x - x0))
+
+
+def findPeak (bands, method=PEAK_INTERPOLATION):
+  """Find the peak of the responses of a set of bands.
+
+  Args:
+    bands: list of objects with cyclePeriod and response attributes, the
+      response being None where there is none yet
+    method: optional QUADRATIC_PEAK or GAUSSIAN_PEAK
+
+  Returns:
+    period: (float) s of the peak, None if no band has a response
+    response: (float) response at the peak
+
+  Raises:
+    None
+  """
+  points = sorted(( 1. / band.cyclePeriod, band.response) for band in bands)
+  best = None
+  for index, ( _, response) in enumerate( points):
+    if response is not None and ( best is None or
+                                  response > points[ best][1]):
+      best = index
+  if best is None:
+    return None, None
+  frequency, response = points[ best]
+  if best == 0 or best == len( points) - 1:
+    return 1. / frequency, response
+  xs = [ point[0] for point in points[ best - 1:best + 2]]
+  ys = [ point[1] for point in points[ best - 1:best + 2]]
+  if None in ys:
+    return 1. / frequency, response
+
+  if method == GAUSSIAN_PEAK and min( ys) > 0:
+    x, y = vertex( xs, [ math.log( y) for y in ys])
+    y = math.exp( y)
+  else:
+    x, y = vertex( xs, ys)
+  if x is None or x < xs[0] or x > xs[2]:
+    return 1. / frequency, response
+  return 1. / x, max( y, response)
+
+
+def waveLength (period):
+  """Get the wave length of a deep water wave.
+
+  Args:
+    period: (float) s of the wave
+
+  Returns:
+    (float) wave length in ft
+
+  Raises:
+    None
+  """
+  return GRAVITY_CONSTANT * period * period / ( 2 * math.pi)
+
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  import numpy as np
+
+  import spectrum
+  from config import DESIRED_PERIOD
+  from config import MINIMUM_NUMBER_OF_CYCLES
+
+  periods = [ 1.0 + 0.5 * i for i in range( 10)] # a coarse grid
+  history = spectrum.SpectrumHistory( MINIMUM_NUMBER_OF_CYCLES * max( periods))
+  shared = spectrum.Spectrum( history)
+  for period in periods:
+    shared.resamples.append( spectrum.SpectrumBand( period))
+  ticks = np.arange( 0, 60, DESIRED_PERIOD)
+  for actual in [ 2.2, 3.1, 3.35, 4.8]:
+    history.reset()
+    history.updateBlock( np.sin( 2 * math.pi * ticks / actual))
+    shared.fft()
+    for method in [ QUADRATIC_PEAK, GAUSSIAN_PEAK]:
+      period, response = findPeak( shared.resamples, method)
+      print "actual {0:.2f} s, {1} found {2:.3f} s {3:.1f} ft response" \
+          " {4:.0f}".format( actual, method, period, waveLength( period),
+                             response)
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
@@ -0,0 +1,213 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+regrid -- module for putting measurements onto an exact time grid
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+Sensor ticks come from the clock and wander around DESIRED_PERIOD, and
+recorded files have gaps where the recorder was stopped. A regrid object
+takes blocks of measurements and gives back values on the grid of exact
+multiples of the period since the epoch, using the same NORMALIZATION_METHOD
+as the resamples.
+
+The last measurement of a block is carried over, so the grid continues
+smoothly across blocks. Where measurements are more than gapThreshold apart,
+nothing is made up for the gap. Instead the grid starts a new segment and
+its position is returned, so later stages can start over there.
+
+Measurements that do not move time forward are dropped.
+"""
+
+
+#### IMPORTS ####
+
+import math
+
+import numpy as np
+
+from config import DESIRED_PERIOD
+from config import GAP_THRESHOLD
+from config import CLOSEST_METHOD
+from config import NORMALIZATION_METHOD
+
+
+#### CLASSES ####
+
+class Regrid (object):
+  """put blocks of measurements onto an exact time grid
+
+  attributes:
+    period: (float) s between grid ticks
+    gapThreshold: (float) s between measurements that starts a new segment
+    lastTick: (float) epoch in s of the last measurement, None before any
+    lastValue: (float) value of the last measurement
+    nextIndex: (int) grid index of the next grid tick
+  """
+
+  def __init__ (self, period=DESIRED_PERIOD, gapThreshold=GAP_THRESHOLD):
+    """Initialize a regrid object.
+
+    Args:
+      period: (float) optional s between grid ticks
+      gapThreshold: (float) optional s between measurements that starts a
+        new segment
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.period = period
+    self.gapThreshold = gapThreshold
+    self.lastTick = None
+    self.lastValue = None
+    self.nextIndex = None
+    self._broken = True # the next grid tick starts a segment
+
+
+  def update (self, ticks, values):
+    """Put a block of measurements onto the grid.
+
+    Args:
+      ticks: (float array) epoch times of the measurements in s
+      values: (float array) measured values
+
+    Returns:
+      gridTicks: (float array) epoch times of the grid in s
+      gridValues: (float array) values at the grid ticks
+      starts: (int array) positions in gridTicks that start a new segment
+
+    Raises:
+      None
+    """
+    ticks = np.asarray( ticks, dtype=np.float64)
+    values = np.asarray( values, dtype=np.float64)
+    continuing = self.lastTick is not None
+    if continuing:
+      ticks = np.concatenate(( [self.lastTick], ticks))
+      values = np.concatenate(( [self.lastValue], values))
+    if len( ticks) == 0:
+      return np.empty( 0), np.empty( 0), np.empty( 0, dtype=int)
+
+    # drop measurements that do not move time forward
+    keep = np.ones( len( ticks), dtype=bool)
+    keep[ 1:] = ticks[ 1:] > np.maximum.accumulate( ticks)[ :-1]
+    ticks = ticks[ keep]
+    values = values[ keep]
+
+    gaps = np.flatnonzero( np.diff( ticks) > self.gapThreshold) + 1
+    pieces = []
+    starts = []
+    count = 0
+    for first, last in zip( np.concatenate(( [0], gaps)),
+                            np.concatenate(( gaps, [len( ticks)]))):
+      if first == 0 and continuing:
+        firstIndex = self.nextIndex
+      else:
+        firstIndex = int( math.ceil( ticks[ first] / self.period))
+        self._broken = True
+      lastIndex = int( math.floor( ticks[ last - 1] / self.period))
+      if lastIndex >= firstIndex:
+        if self._broken:
+          starts.append( count)
+          self._broken = False
+        pieces.append( np.arange( firstIndex, lastIndex + 1))
+        count = count + lastIndex + 1 - firstIndex
+        self.nextIndex = lastIndex + 1
+      else:
+        self.nextIndex = firstIndex
+    self.lastTick = ticks[-1]
+    self.lastValue = values[-1]
+
+    if not pieces:
+      return np.empty( 0), np.empty( 0), np.empty( 0, dtype=int)
+    gridTicks = np.concatenate( pieces) * self.period
+    return gridTicks, gridValues( gridTicks, ticks, values), \
+        np.array( starts, dtype=int)
+
+
+#### FUNCTIONS ####
+
+def gridValues (gridTicks, ticks, values):
+  """Determine the values at grid ticks between measurements
+
+  Args:
+    gridTicks: (float array) epoch times in s of the desired values
+    ticks: (float array) increasing epoch times in s of the measurements
+    values: (float array) measured values
+
+  Returns:
+    (float array) values at the grid ticks
+
+  Raises:
+    None
+  """
+  if NORMALIZATION_METHOD == CLOSEST_METHOD and len( ticks) > 1:
+    later = np.clip( np.searchsorted( ticks, gridTicks), 1, len( ticks) - 1)
+    timeRatios = ( gridTicks - ticks[ later - 1]) / \
+        ( ticks[ later] - ticks[ later - 1])
+    return np.where( timeRatios < .5, values[ later - 1], values[ later])
+  return np.interp( gridTicks, ticks, values)
+
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  jitter = np.random.RandomState( 1)
+  ticks = 1533571200.01 + np.arange( 3000) * DESIRED_PERIOD + \
+      jitter.uniform( -.005, .005, 3000)
+  ticks[ 1500:] = ticks[ 1500:] + 10 # a gap
+  values = np.sin( ticks)
+
+  regridder = Regrid()
+  results = [regridder.update( ticks[ i:i + 128], values[ i:i + 128])
+             for i in range( 0, len( ticks), 128)]
+  gridTicks = np.concatenate([ result[0] for result in results])
+  print "grid points:", len( gridTicks)
+  print "grid steps:", np.unique( np.round( np.diff( gridTicks), 6))
+  print "largest error:", np.abs( np.concatenate(
+    [ result[1] for result in results]) - np.sin( gridTicks)).max()
+  offset = 0
+  for result in results:
+    for start in result[2]:
+      print "segment starts at", repr( result[0][ start]), \
+          "position", offset + start
+    offset = offset + len( result[0])
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
@@ -27,8 +27,9 @@ THE SOFTWARE.
 
 #### IMPORTS ####
 
-import datetime
 import sys
+
+import clock
 from config import VERB_COMMON
 from config import VERB_DEBUG
 from config import MAX_LIST
@@ -44,15 +45,18 @@ class ReportChannel( object):
     name: string representing the output channel name
     handle: file handle for the output
     verbosity: interger representing the amount of information desired
+    clock: clock.Clock used for the time stamps
   """
 
-  def __init__ ( self, filename, verbosity=0):
+  def __init__ ( self, filename, verbosity=0, reportClock=None):
     """Return a ReportChannel object selected with *filename* and contolled
     with *verbosity*.
   
     Args:
       filename: (str) file name
       verbosity: (int) Desired level of message output
+      reportClock: (clock.Clock) optional clock for the time stamps, a live
+        clock by default
     
     Returns:
       None
@@ -66,6 +70,9 @@ class ReportChannel( object):
     else:
       self.handle = open(filename,"a")
     self.verbosity = verbosity
+    if reportClock is None:
+      reportClock = clock.Clock()
+    self.clock = reportClock
 
 
 # pylint disable=pointless-statement
@@ -141,7 +148,7 @@ class ReportChannel( object):
 
     if verbosity >= self.verbosity:
       dateString = '{:%b %d %H:%M:%S}'.format(
-        datetime.datetime.fromtimestamp (float(tick)))
+        self.clock.datetime( tick))
       self.writeln( "{:<16} {:<5} {}".format(
         dateString, processName, message))
 
@@ -161,7 +168,7 @@ class ReportChannel( object):
 
     if VERB_COMMON <= self.verbosity:
       dateString = '{:%b %d %H:%M:%S}'.format(
-        datetime.datetime.fromtimestamp (tick) )
+        self.clock.datetime( tick))
       self.writeln( "{:<16} {:<5} {}".format(
         dateString, "", message))
 
@@ -199,7 +206,7 @@ class ReportChannel( object):
     """
   
     dateString = '{:%b %d %H:%M:%S}'.format(
-      datetime.datetime.fromtimestamp (tick))
+      self.clock.datetime( tick))
     if verbosity >= self.verbosity:
       print "{:<16} {:<5} {}".format(dateString, processName, message)
 
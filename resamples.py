@@ -33,11 +33,34 @@ original sample is resampled at a rate determined by the desired frequency
 for the FFT analysis. For this module the FFT performed on the resampled data
 is only interested in a single FFT response.
 
-A resamples object holds a collection of resample objects.
+A resamples object holds a collection of resample objects. It keeps the due
+ticks and resampling periods of all of its streams in arrays, so the resamples
+due at a measurement, or over a whole block of measurements, are interpolated
+with numpy instead of stream by stream. The arithmetic is the same as that of
+Resample.evaluate, so the resamples are exactly the same. Its FFTs are done
+together: the sample buffers of the same length are stacked into the rows of
+one array and transformed with a single rfft call, and each response is read
+from its own row.
 
 sample->resampling->sample series->FFT->response for particular freqency
 
-'freshen' isn't quite the right word. It releases older list members.
+'freshen' isn't quite the right word. It released older list members. The
+resampled levels are now kept in a ring buffer of the latest minimumSamples,
+so there is nothing left for it to do.
+
+The FFT sample buffer is the last numberOfCycles % 3 cycles followed by
+numberOfCycles // 3 copies of the last 3 cycles, and the response is bin
+numberOfCycles. Each of those pieces is a whole number of cycles, so the bin
+is the sum of the sliding single bin DFTs of the last partial cycles and of
+the last 3 cycles, the latter counted numberOfFullCycles times. With the
+SLIDING_DFT_ENGINE these sums are updated as each resample is added, which is
+the same response as the FFT without transforming the buffer every time.
+The sums are redone from the levels every SLIDING_DFT_REFRESH resamples so
+rounding errors cannot build up.
+
+A resample is dirty when it has new levels since its last response. The long
+periods get a new level only every few FFTs, so the FFTs skip the clean
+resamples and their last response is reported again.
 
 """
 
@@ -45,11 +68,13 @@ sample->resampling->sample series->FFT->response for particular freqency
 
 #### IMPORTS ####
 
+import cmath                           # for exp of complex numbers
 import math                            # for pi, sqrt, ceil
 
 import numpy as np                     # for FFT
 from numpy import arange               # for FFT
 
+import ringbuffer
 from config import SAMPLES_PER_SECOND
 from config import RESOLUTION
 from config import MINIMUM_NUMBER_OF_CYCLES
@@ -60,6 +85,15 @@ from config import GRAVITY_CONSTANT
 #from config import TARGET_PERIODS
 #from config import BOAT_LENGTHS
 from config import BUFFER_SIZE 
+from config import SLIDING_DFT_ENGINE
+from config import RESPONSE_ENGINE
+from config import SLIDING_DFT_REFRESH
+from config import RESAMPLE_DTYPE
+
+
+#### CONSTANTS ####
+
+CLOSEST_INTERPOLATION = NORMALIZATION_METHOD == CLOSEST_METHOD
 
 
 #### CLASSES ####
@@ -70,6 +104,8 @@ class Resamples (object):
   Methods:
     __init__: construct the resample object
     evaluate: add a new element to all time series
+    evaluateBlock: add the elements for a block of measurements
+    reset: start all time series over
     freshen: drop older elements from all time series
   """
 
@@ -87,6 +123,8 @@ class Resamples (object):
       None
     """
     self.resamples = []
+    self.dueTicks = np.empty( 0) # resamplingDueTick of each stream
+    self.periods = np.empty( 0) # resamplingPeriod of each stream
 
 
   def evaluate( self, tick, value, lastTick, lastValue ):
@@ -101,11 +139,109 @@ class Resamples (object):
     Returns:
       None
     
+    Raises:
+      None
+    """
+    if len( self.periods) != len( self.resamples):
+      self.gather()
+    while True: # this should not loop, but in case
+      due = np.flatnonzero( tick > self.dueTicks)
+      if len( due) == 0:
+        break
+      dueTicks = self.dueTicks[ due]
+      levels = interpolateArray( dueTicks, tick, value, lastTick, lastValue)
+      nextDueTicks = dueTicks + self.periods[ due]
+      self.dueTicks[ due] = nextDueTicks
+      for i, dueTick, level, nextDueTick in zip(
+          due.tolist(), dueTicks.tolist(), levels.tolist(),
+          nextDueTicks.tolist()):
+        resample = self.resamples[i]
+        resample.append( level)
+        resample.lastTime = dueTick # time of last resample
+        resample.resamplingDueTick = nextDueTick
+
+
+  def evaluateBlock( self, ticks, values, lastTick, lastValue):
+    """Resample a block of measurements for all measurement buffers.
+
+    This gives the same resamples as calling evaluate() for each
+    measurement in turn.
+
+    Args:
+      ticks: (float array) increasing epoch times of the measurements
+      values: (float array) wave heights in inches
+      lastTick: (float) time as epoch of the measurement before the block
+      lastValue: (float) wave height in inches before the block
+    
+    Returns:
+      None
+    
+    Raises:
+      None
+    """
+    if len( ticks) == 0:
+      return
+    if len( self.periods) != len( self.resamples):
+      self.gather()
+    ticks = np.asarray( ticks, dtype=np.float64)
+    values = np.asarray( values, dtype=np.float64)
+    # the measurement before each one
+    lastTicks = np.concatenate(( [lastTick], ticks[ :-1]))
+    lastValues = np.concatenate(( [lastValue], values[ :-1]))
+    for i in np.flatnonzero( ticks[-1] > self.dueTicks).tolist():
+      # the due ticks by repeated addition, just as one at a time
+      count = int(( ticks[-1] - self.dueTicks[i]) / self.periods[i]) + 2
+      dueTicks = np.cumsum( np.concatenate((
+        [self.dueTicks[i]], np.repeat( self.periods[i], count))))
+      due = dueTicks[ dueTicks < ticks[-1]]
+      # interpolate each between the first later measurement and the one
+      # before it
+      later = np.searchsorted( ticks, due, side='right')
+      resample = self.resamples[i]
+      resample.extend( interpolateArray( due, ticks[ later], values[ later],
+                                         lastTicks[ later],
+                                         lastValues[ later]))
+      resample.lastTime = float( due[-1])
+      resample.resamplingDueTick = float( dueTicks[ len( due)])
+      self.dueTicks[i] = dueTicks[ len( due)]
+
+
+  def gather( self):
+    """Gather the due ticks and periods of the streams into arrays.
+
+    This is needed when streams are added to the resamples list.
+
+    Args:
+      None
+    
+    Returns:
+      None
+    
+    Raises:
+      None
+    """
+    self.dueTicks = np.array([ resample.resamplingDueTick
+                               for resample in self.resamples], dtype=float)
+    self.periods = np.array([ resample.resamplingPeriod
+                              for resample in self.resamples], dtype=float)
+
+
+  def reset( self, tick, value):
+    """Start all time series over, as after a gap in the measurements.
+
+    Args:
+      tick: (float) current time as epoch
+      value: (float) current wave height in inches
+    
+    Returns:
+      None
+    
     Raises:
       None
     """
     for resample in self.resamples:
-      resample.evaluate( tick, value, lastTick, lastValue)
+      resample.reset( tick, value)
+    self.gather()
 
 
   def fft( self):
@@ -119,8 +255,7 @@ class Resamples (object):
     Raises:
       None
     """
-    for resample in self.resamples:
-      resample.fft()
+    batchFft( self.resamples)
 
 
   def freshen( self):
@@ -148,6 +283,7 @@ class Resample (object):
   Methods:
     __init__: construct the resample object
     evaluate: add a new element to a time series
+    reset: start the time series over
     freshen: drop older elements from a time series
   """
 
@@ -177,15 +313,24 @@ class Resample (object):
       self.resamplingPeriod = cyclePeriod / samplesPerCycle # s between samples
       self.samplesPerCycle = int( samplesPerCycle) # akin to resolution
       self.minimumSamples = int( samplesPerCycle * MINIMUM_NUMBER_OF_CYCLES)
+      # build out the FFT buffer with an integral number of cycles
+      self.numberOfCycles = BUFFER_SIZE / self.samplesPerCycle
+      self.numberOfPartialCycles = int( self.numberOfCycles %
+                                        MINIMUM_NUMBER_OF_CYCLES)
+      self.numberOfFullCycles = int( self.numberOfCycles /
+                                     MINIMUM_NUMBER_OF_CYCLES)
+      self.bufferSize = ( self.numberOfPartialCycles +
+                          self.numberOfFullCycles * MINIMUM_NUMBER_OF_CYCLES) * \
+          self.samplesPerCycle
       #self.frequencyOfInterest = 1. / cyclePeriod # used to check FFT FoI
       self.waveLength = cyclePeriod * math.sqrt( 2 * math.pi *
                                                  GRAVITY_CONSTANT)
-      self.levels = []  # list of resampled levels
-      # record the first sample and get ready for next sample
-      self.levels.append( value)
-      self.lastTime = tick # time of last resample
-      self.resamplingDueTick = tick + self.resamplingPeriod # epoch in s
-      self.response = None
+      # bin of interest factors by resample number modulo samplesPerCycle
+      self.twiddles = [cmath.exp( -2j * math.pi * i / self.samplesPerCycle)
+                       for i in range( self.samplesPerCycle)]
+      self.levels = ringbuffer.RingBuffer( # latest resampled levels
+        min( self.minimumSamples, BUFFER_SIZE), np.dtype( RESAMPLE_DTYPE))
+      self.reset( tick, value)
 
 
   def evaluate( self, tick, value, lastTick, lastValue ):
@@ -205,12 +350,133 @@ class Resample (object):
     """
 
     while tick > self.resamplingDueTick: # this should not loop, but in case
-      self.levels.append( interpolate( self.resamplingDueTick, tick, value,
-                                       lastTick, lastValue) )
+      self.append( interpolate( self.resamplingDueTick, tick, value,
+                                lastTick, lastValue) )
       self.lastTime = self.resamplingDueTick # time of last resample
       self.resamplingDueTick = self.resamplingDueTick + self.resamplingPeriod
 
 
+  def reset( self, tick, value):
+    """Start the time series over, dropping the older samples.
+
+    This avoids resampling across a gap in the measurements.
+
+    Args:
+      tick: (float) current time as epoch
+      value: (float) current wave height in inches
+  
+    Returns:
+      None
+    
+    Raises:
+      None
+    """
+    self.levels.clear()
+    self.levels.append( value)
+    self.numberOfSamples = 1 # resamples since the start
+    self.lastTime = tick # time of last resample
+    self.resamplingDueTick = tick + self.resamplingPeriod # epoch in s
+    self.response = None
+    self.dirty = True # new levels since the last response
+    if RESPONSE_ENGINE == SLIDING_DFT_ENGINE:
+      self.sumWindows()
+
+
+  def append( self, level):
+    """Add a resampled level to the time series.
+
+    Args:
+      level: (float) resampled wave height in inches
+  
+    Returns:
+      None
+    
+    Raises:
+      None
+    """
+    if RESPONSE_ENGINE == SLIDING_DFT_ENGINE:
+      # slide the windows: add the new level, drop the one a window ago
+      twiddle = self.twiddles[ self.numberOfSamples % self.samplesPerCycle]
+      partialSamples = self.numberOfPartialCycles * self.samplesPerCycle
+      if partialSamples > 0:
+        if self.numberOfSamples >= partialSamples:
+          self.partialSum = self.partialSum + \
+              ( level - self.levels[ -partialSamples]) * twiddle
+        else:
+          self.partialSum = self.partialSum + level * twiddle
+      if self.numberOfSamples >= self.minimumSamples:
+        self.fullSum = self.fullSum + \
+            ( level - self.levels[ -self.minimumSamples]) * twiddle
+      else:
+        self.fullSum = self.fullSum + level * twiddle
+
+    self.levels.append( level)
+    self.numberOfSamples = self.numberOfSamples + 1
+    self.dirty = True
+    if RESPONSE_ENGINE == SLIDING_DFT_ENGINE and \
+        self.numberOfSamples % SLIDING_DFT_REFRESH == 0:
+      self.sumWindows()
+
+
+  def extend( self, levels):
+    """Add resampled levels to the time series.
+
+    Args:
+      levels: (float array) resampled wave heights in inches, oldest first
+  
+    Returns:
+      None
+    
+    Raises:
+      None
+    """
+    if RESPONSE_ENGINE == SLIDING_DFT_ENGINE:
+      for level in levels.tolist():
+        self.append( level)
+    else:
+      self.levels.extend( levels)
+      self.numberOfSamples = self.numberOfSamples + len( levels)
+      self.dirty = True
+
+
+  def sumWindows( self):
+    """Sum the bin of interest over the partial and full cycle windows.
+
+    Args:
+      None
+  
+    Returns:
+      None
+    
+    Raises:
+      None
+    """
+    self.partialSum = self.windowSum(
+      self.numberOfPartialCycles * self.samplesPerCycle)
+    self.fullSum = self.windowSum( self.minimumSamples)
+
+
+  def windowSum( self, windowSamples):
+    """Sum the bin of interest over the latest resamples.
+
+    Args:
+      windowSamples: (int) number of resamples in the window
+  
+    Returns:
+      (complex) sum of the levels times their twiddle factors
+    
+    Raises:
+      None
+    """
+    count = min( windowSamples, len( self.levels))
+    if count == 0:
+      return 0j
+    first = self.numberOfSamples - count # resample number of the first one
+    indexes = ( first + np.arange( count)) % self.samplesPerCycle
+    return complex( np.dot( self.levels.latest( count),
+                            np.array( self.twiddles)[ indexes]))
+
+
   def fft( self):
     """ find the frequence response for a collection of samples
 
@@ -224,28 +490,60 @@ class Resample (object):
       None
     """
 
-    #STATIC stuff for constructor?
-    # build out the buffer with an integral number of samples
-    numberOfCycles = BUFFER_SIZE / self.samplesPerCycle
-    numberOfPartialCycles = int( numberOfCycles % MINIMUM_NUMBER_OF_CYCLES)
-    numberOfFullCycles = int( numberOfCycles / MINIMUM_NUMBER_OF_CYCLES)
-
-    if len( self.levels) >= MINIMUM_NUMBER_OF_CYCLES * self.samplesPerCycle:
-      sampleBuffer = self.levels[
-        -int (numberOfPartialCycles * self.samplesPerCycle):]
-      if numberOfFullCycles > 0:
-        for _ in range( 0, numberOfFullCycles):
-          sampleBuffer = sampleBuffer + self.levels[
-            -int( MINIMUM_NUMBER_OF_CYCLES * self.samplesPerCycle):]
+    if not self.dirty:
+      return # the last response still holds
+    self.dirty = False
+    if self.isReady() and RESPONSE_ENGINE == SLIDING_DFT_ENGINE:
+      self.response = abs( self.partialSum +
+                           self.numberOfFullCycles * self.fullSum)
+    elif self.isReady():
+      sampleBuffer = np.empty( self.bufferSize)
+      self.fillBuffer( sampleBuffer)
 
       # transform sample into a response
       fft = np.fft.rfft( sampleBuffer)
 
       #frequencyOfInterestIndex = log2( numberOfCycles)
-      frequencyOfInterestIndex = numberOfCycles
+      frequencyOfInterestIndex = self.numberOfCycles
       self.response = abs(fft[ frequencyOfInterestIndex])
 
 
+  def isReady( self):
+    """Check for enough samples for a response.
+
+    Args:
+      None
+
+    Returns:
+      True if there are enough samples for the FFT buffer
+
+    Raises:
+      None
+    """
+    return len( self.levels) >= \
+        MINIMUM_NUMBER_OF_CYCLES * self.samplesPerCycle
+
+
+  def fillBuffer( self, sampleBuffer):
+    """Build out the FFT sample buffer with an integral number of cycles.
+
+    Args:
+      sampleBuffer: (float array) bufferSize array to be filled, such as a
+        row of a batch of buffers
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    partialSamples = self.numberOfPartialCycles * self.samplesPerCycle
+    sampleBuffer[ :partialSamples] = self.levels.latest( partialSamples)
+    fullCycles = sampleBuffer[ partialSamples:].reshape(
+      self.numberOfFullCycles, self.minimumSamples)
+    fullCycles[:] = self.levels.latest( self.minimumSamples)
+
+
   def freshen( self):
     """Freshen the resampled data by deleting older data.
 
@@ -259,14 +557,53 @@ class Resample (object):
       None
     """
 
-    if len( self.levels) > self.minimumSamples:
-      self.levels = self.levels [-self.minimumSamples:]
+    pass # the ring buffer only keeps the latest samples
 
 # pylint: enable=too-many-instance-attributes
 
 
 #### FUNCTIONS ####
 
+def batchFft( resampleList):
+  """Find the frequency responses of many resample streams at once
+
+  Buffers of the same length are transformed together in one rfft call.
+  Resamples without new levels keep their last response.
+
+  Args:
+    resampleList: (list of Resample) streams, possibly from several
+      Resamples collections
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  if RESPONSE_ENGINE == SLIDING_DFT_ENGINE:
+    for resample in resampleList:
+      resample.fft()
+    return
+
+  groups = {} # ready resamples by buffer size
+  for resample in resampleList:
+    if not resample.dirty:
+      continue
+    resample.dirty = False
+    if resample.isReady():
+      groups.setdefault( resample.bufferSize, []).append( resample)
+  for bufferSize, group in groups.items():
+    sampleBuffers = np.empty(( len( group), bufferSize))
+    for row, resample in enumerate( group):
+      resample.fillBuffer( sampleBuffers[ row])
+    spectra = np.fft.rfft( sampleBuffers, axis=1)
+    responses = np.abs( spectra[ np.arange( len( group)),
+                                 [resample.numberOfCycles
+                                  for resample in group]])
+    for resample, response in zip( group, responses):
+      resample.response = response
+
+
 def interpolate( desiredTick, currentTick, currentValue, lastTick, lastValue):
   """Determines a sampled value between two measurements
 
@@ -303,6 +640,36 @@ def interpolate( desiredTick, currentTick, currentValue, lastTick, lastValue):
 
 
 
+def interpolateArray( desiredTicks, currentTicks, currentValues, lastTicks,
+                      lastValues):
+  """Determines sampled values between measurements
+
+  This is interpolate() for arrays, with the same arithmetic. The
+  measurements may be single values or arrays matching desiredTicks.
+ 
+  Args:
+    desiredTicks : (float array) epoch times in s of the desired values
+    currentTicks : epoch times in s of the current value measurements
+    currentValues : current values
+    lastTicks : epoch times in s of the last value measurements
+    lastValues : last values
+  
+  Returns:
+    (float array) interpolated values
+  
+  Raises:
+    None
+  """
+  spans = np.subtract( currentTicks, lastTicks)
+  later = spans > 0
+  timeRatios = np.where(
+    later, ( desiredTicks - lastTicks) / np.where( later, spans, 1.), 1.)
+  if CLOSEST_INTERPOLATION:
+    return np.where( timeRatios < .5, lastValues, currentValues)
+  return lastValues + timeRatios * ( np.subtract( currentValues, lastValues))
+
+
+
 # pylint: disable=too-many-arguments
 # pylint: disable=pointless-string-statement
 '''
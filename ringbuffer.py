@@ -0,0 +1,185 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+ringbuffer -- module for a fixed size buffer of the latest values
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+A ring buffer keeps the latest capacity values in a numpy array that is
+allocated once. Each value is written twice, capacity apart, in an array of
+twice the capacity. That way the latest values are always one contiguous
+slice of the array, and latest() returns a view of them without copying.
+
+Indexing works like a list of the values in the buffer, oldest first, so
+buffer[-1] is the latest value.
+"""
+
+
+#### IMPORTS ####
+
+import numpy as np
+
+
+#### CLASSES ####
+
+class RingBuffer (object):
+  """a fixed size buffer of the latest values
+
+  attributes:
+    capacity: (int) maximum number of values kept
+    length: (int) number of values in the buffer
+  """
+
+  def __init__ (self, capacity, dtype=np.float64):
+    """Allocate a ring buffer.
+
+    Args:
+      capacity: (int) maximum number of values kept
+      dtype: optional numpy type of the values
+
+    Returns:
+      None
+
+    Raises:
+      ValueError if the capacity is not positive
+    """
+    if capacity < 1:
+      raise ValueError( "RingBuffer capacity must be positive")
+    self.capacity = capacity
+    self.length = 0
+    self._data = np.zeros( 2 * capacity, dtype=dtype)
+    self._end = capacity # one past the latest value in the second copy
+
+
+  def __len__ (self):
+    return self.length
+
+
+  def __getitem__ (self, key):
+    if isinstance( key, slice):
+      return self.latest( self.length)[ key]
+    if key < 0:
+      key = key + self.length
+    if key < 0 or key >= self.length:
+      raise IndexError( "RingBuffer index out of range")
+    return self._data[ self._end - self.length + key]
+
+
+  def append (self, value):
+    """Add a value, dropping the oldest one if the buffer is full.
+
+    Args:
+      value: (float) value to be added
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    end = self._end
+    self._data[ end - self.capacity] = value
+    self._data[ end] = value
+    if end + 1 == 2 * self.capacity:
+      self._end = self.capacity
+    else:
+      self._end = end + 1
+    if self.length < self.capacity:
+      self.length = self.length + 1
+
+
+  def extend (self, values):
+    """Add values in order, dropping the oldest ones as the buffer fills.
+
+    Args:
+      values: (float array) values to be added
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    values = np.asarray( values)[ -self.capacity:]
+    count = len( values)
+    end = self._end
+    first = min( count, 2 * self.capacity - end) # before wrapping around
+    self._data[ end:end + first] = values[ :first]
+    self._data[ end - self.capacity:end - self.capacity + first] = \
+        values[ :first]
+    rest = count - first
+    if rest > 0:
+      self._data[ self.capacity:self.capacity + rest] = values[ first:]
+      self._data[ :rest] = values[ first:]
+    self._end = self.capacity + ( end - self.capacity + count) % self.capacity
+    self.length = min( self.length + count, self.capacity)
+
+
+  def latest (self, count):
+    """Get the latest values.
+
+    Args:
+      count: (int) number of values, no more than the length
+
+    Returns:
+      contiguous array view of the values, oldest first
+
+    Raises:
+      ValueError if there are not that many values
+    """
+    if count > self.length:
+      raise ValueError( "RingBuffer has fewer values than requested")
+    return self._data[ self._end - count:self._end]
+
+
+  def clear (self):
+    """Remove all of the values."""
+    self.length = 0
+
+
+#### FUNCTIONS ####
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  ring = RingBuffer( 5)
+  for value in range( 12):
+    ring.append( value)
+    print value, ring.latest( len( ring)), ring[-1], ring[0]
+  print "slice", ring[ -3:]
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
@@ -0,0 +1,245 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+spectrogram -- module for short time spectra of the wave heights
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+A spectrogram is a series of frames, each the whole spectrum of the latest
+frameSize values of the wave heights. The wave heights are decimated first
+by averaging, in a spectrum.SpectrumHistory, so a frame covers minutes of
+waves with a modest FFT. A new frame is due every hop values, so frames
+overlap by frameSize - hop values.
+
+The history keeps a few hops more than a frame. When frames are processed,
+every frame that is due is a strided view into the same history, so the
+overlap is never copied, and all of them are windowed and transformed in
+one rfft call. The Hann window, the frequencies and the scale of each bin
+are worked out once.
+
+Each frame gives the amplitude in inches of the wave heights at each
+frequency, with the loss in the averaging taken out. The latest frames are
+kept in frames for whoever wants them.
+"""
+
+
+#### IMPORTS ####
+
+import collections
+
+import numpy as np
+
+import spectrum
+from config import DESIRED_PERIOD
+from config import SPECTROGRAM_DECIMATION
+from config import SPECTROGRAM_FRAME_SIZE
+from config import SPECTROGRAM_FRAMES_KEPT
+from config import SPECTROGRAM_HOP
+
+
+#### CONSTANTS ####
+
+FRAME_BACKLOG = 8 # hops of history kept beyond a frame, for late processing
+
+
+#### CLASSES ####
+
+class Spectrogram (object):
+  """overlapping windowed spectra of the wave heights
+
+  attributes:
+    frameSize: (int) history values in each frame
+    hop: (int) history values between frames
+    history: spectrum.SpectrumHistory of the decimated wave heights
+    frequencies: (float array) Hz of each bin of a frame
+    frames: deque of (tick, amplitudes) for the latest frames, where tick is
+      the epoch in s at the end of the frame and amplitudes is a float array
+      of inches for each frequency
+  """
+
+  def __init__ (self, frameSize=SPECTROGRAM_FRAME_SIZE, hop=SPECTROGRAM_HOP,
+                decimation=SPECTROGRAM_DECIMATION):
+    """Initialize a spectrogram with no frames.
+
+    Args:
+      frameSize: (int) optional history values in each frame
+      hop: (int) optional history values between frames
+      decimation: (int) optional wave heights averaged into each value
+
+    Returns:
+      None
+
+    Raises:
+      ValueError if the hop is not between 1 and the frame size
+    """
+    if hop < 1 or hop > frameSize:
+      raise ValueError( "Spectrogram hop must be from 1 to the frame size")
+    self.frameSize = frameSize
+    self.hop = hop
+    self.history = spectrum.SpectrumHistory(
+      ( frameSize + FRAME_BACKLOG * hop) * DESIRED_PERIOD * decimation,
+      decimation)
+    self.frequencies = np.fft.rfftfreq( frameSize, self.history.period)
+    self.frames = collections.deque( maxlen=SPECTROGRAM_FRAMES_KEPT)
+    self._window = np.hanning( frameSize)
+    self._scale = 2. / self._window.sum() / np.array(
+      [self.history.gain( frequency) for frequency in self.frequencies])
+    self._scale[ 0] = self._scale[ 0] / 2 # no negative frequency to add
+    self._nextEnd = frameSize # history count at the end of the next frame
+
+
+  def update (self, value):
+    """Add a wave height.
+
+    Args:
+      value: (float) wave height in inches
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.history.update( value)
+
+
+  def updateBlock (self, values):
+    """Add a block of wave heights.
+
+    Args:
+      values: (float array) wave heights in inches
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.history.updateBlock( values)
+
+
+  def reset (self):
+    """Start over, as after a gap in the measurements."""
+    self.history.reset()
+    self._nextEnd = self.frameSize
+
+
+  def process (self, tick):
+    """Work out the frames that are due.
+
+    Frames that fell out of the history before being processed are skipped.
+
+    Args:
+      tick: (float) epoch in s of the latest wave height
+
+    Returns:
+      list of (tick, amplitudes) of the new frames, oldest first
+
+    Raises:
+      None
+    """
+    count = self.history.count
+    oldest = count - len( self.history.levels) # count of the oldest value
+    if self._nextEnd - self.frameSize < oldest:
+      skipped = -(( self._nextEnd - self.frameSize - oldest) // self.hop)
+      self._nextEnd = self._nextEnd + skipped * self.hop
+    if self._nextEnd > count:
+      return []
+    ends = np.arange( self._nextEnd, count + 1, self.hop)
+    self._nextEnd = int( ends[-1]) + self.hop
+
+    latest = self.history.levels.latest( count - ends[0] + self.frameSize)
+    frames = np.lib.stride_tricks.as_strided(
+      latest, shape=( len( ends), self.frameSize),
+      strides=( self.hop * latest.strides[0], latest.strides[0]))
+    frames = frames - frames.mean( axis=1)[ :, np.newaxis]
+    amplitudes = np.abs( np.fft.rfft( frames * self._window, axis=1)) * \
+        self._scale
+    newFrames = []
+    for end, frameAmplitudes in zip( ends.tolist(), amplitudes):
+      newFrames.append(( tick - ( count - end) * self.history.period,
+                         frameAmplitudes))
+    self.frames.extend( newFrames)
+    return newFrames
+
+
+  def peak (self, amplitudes):
+    """Find the strongest bin of a frame.
+
+    Args:
+      amplitudes: (float array) inches for each frequency of a frame
+
+    Returns:
+      frequency: (float) Hz of the strongest bin other than the average
+      amplitude: (float) inches at that frequency
+
+    Raises:
+      None
+    """
+    index = int( np.argmax( amplitudes[ 1:])) + 1
+    return self.frequencies[ index], amplitudes[ index]
+
+
+#### FUNCTIONS ####
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  import math
+  import time
+
+  gram = Spectrogram()
+  print "frame of {0} values, {1:.1f} s, every {2:.1f} s, bins {3:.4f} Hz"\
+    .format( gram.frameSize, gram.frameSize * gram.history.period,
+    gram.hop * gram.history.period, gram.frequencies[1])
+  ticks = np.arange( 0, 1200, DESIRED_PERIOD)
+  heights = 2. * np.sin( 2 * math.pi * ticks / 3.) + 0.5 * np.sin(
+    2 * math.pi * ticks / 19.2)
+  start = time.time()
+  frames = []
+  for first in range( 0, len( heights), 6): # about every 200 ms
+    gram.updateBlock( heights[ first:first + 6])
+    frames.extend( gram.process( ticks[ min( first + 5, len( ticks) - 1)]))
+  print "{0} frames in {1:.3f} s".format( len( frames), time.time() - start)
+  tick, amplitudes = frames[-1]
+  order = np.argsort( amplitudes)[::-1][ :4]
+  print "last frame ends at", tick
+  for index in order:
+    print "period {0:6.2f} s amplitude {1:.2f}".format(
+      1. / gram.frequencies[ index], amplitudes[ index])
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
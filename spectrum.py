@@ -0,0 +1,323 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+spectrum -- module for wave responses from one shared history of wave heights
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+This is the SHARED_SPECTRUM engine. Instead of resampling the wave heights
+separately for every wave length and period of interest, the wave heights are
+decimated once by SPECTRUM_DECIMATION, averaging that many samples, into a
+spectrum history. A spectrum holds bands, each with the cycle period of
+interest, and finds all of their responses at once by multiplying the latest
+history by a matrix of complex exponentials.
+
+Each band looks at the last MINIMUM_NUMBER_OF_CYCLES cycles of the history,
+like the resample buffers, and its response is scaled to what an FFT of
+BUFFER_SIZE samples gives, so the responses can be compared with those of
+the resamples. The loss in the averaging is taken out of the scale as well.
+
+The bands have the same cyclePeriod, waveLength and response attributes as
+resample objects and are kept in a list named resamples, so they are reported
+the same way.
+"""
+
+
+#### IMPORTS ####
+
+import math
+
+import numpy as np
+
+import ringbuffer
+from config import BUFFER_SIZE
+from config import DESIRED_PERIOD
+from config import MINIMUM_NUMBER_OF_CYCLES
+from config import SPECTRUM_DECIMATION
+
+
+#### CLASSES ####
+
+class SpectrumHistory (object):
+  """decimated history of wave heights shared by spectra
+
+  Spectra use the levels, period and gain() of a history, so anything with
+  those can stand in for it.
+
+  attributes:
+    decimation: (int) number of wave heights averaged into each history value
+    period: (float) s between history values
+    levels: ringbuffer.RingBuffer of the latest history values
+    count: (int) history values added since the last reset
+  """
+
+  def __init__ (self, duration, decimation=SPECTRUM_DECIMATION):
+    """Initialize an empty history.
+
+    Args:
+      duration: (float) s of history to keep, enough for the longest band
+      decimation: (int) optional number of wave heights in each value
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.decimation = decimation
+    self.period = DESIRED_PERIOD * decimation
+    self.levels = ringbuffer.RingBuffer(
+      int( math.ceil( duration / self.period)))
+    self.count = 0
+    self._sum = 0.
+    self._count = 0
+
+
+  def gain (self, frequency):
+    """Get the amplitude gain of the averaging at a frequency.
+
+    Args:
+      frequency: (float) Hz
+
+    Returns:
+      (float) ratio of the history amplitude to the wave height amplitude
+
+    Raises:
+      None
+    """
+    omega = 2 * math.pi * frequency * DESIRED_PERIOD # radians per height
+    if self.decimation == 1 or omega == 0:
+      return 1.
+    return abs( math.sin( self.decimation * omega / 2) /
+                ( self.decimation * math.sin( omega / 2)))
+
+
+  def update (self, value):
+    """Add a wave height.
+
+    Args:
+      value: (float) wave height in inches
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self._sum = self._sum + value
+    self._count = self._count + 1
+    if self._count == self.decimation:
+      self.levels.append( self._sum / self.decimation)
+      self.count = self.count + 1
+      self._sum = 0.
+      self._count = 0
+
+
+  def updateBlock (self, values):
+    """Add a block of wave heights.
+
+    Args:
+      values: (float array) wave heights in inches
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    values = np.asarray( values, dtype=np.float64)
+    first = min( len( values), ( self.decimation - self._count) %
+                 self.decimation)
+    for value in values[ :first].tolist(): # finish the partial value
+      self.update( value)
+    whole = ( len( values) - first) // self.decimation * self.decimation
+    if whole > 0:
+      self.levels.extend( values[ first:first + whole].reshape(
+        -1, self.decimation).mean( axis=1))
+      self.count = self.count + whole // self.decimation
+    for value in values[ first + whole:].tolist():
+      self.update( value)
+
+
+  def reset (self):
+    """Start the history over, as after a gap in the measurements."""
+    self.levels.clear()
+    self.count = 0
+    self._sum = 0.
+    self._count = 0
+
+
+
+class SpectrumBand (object):
+  """a cycle period of interest in a spectrum
+
+  attributes:
+    cyclePeriod: (float) period of cycle in s
+    period: (float) the same, for reporting by period
+    waveLength: (float) wave length in ft, if set by the owner
+    response: (float) latest response, None until there is enough history
+  """
+
+  def __init__ (self, cyclePeriod):
+    """Initialize a band.
+
+    Args:
+      cyclePeriod: (float) period of cycle in s
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.cyclePeriod = cyclePeriod
+    self.period = cyclePeriod
+    self.waveLength = None
+    self.response = None
+
+
+
+class Spectrum (object):
+  """responses of a list of bands from a shared history
+
+  attributes:
+    history: SpectrumHistory of the wave heights
+    resamples: list of SpectrumBand objects
+  """
+
+  def __init__ (self, history):
+    """Initialize a spectrum with no bands.
+
+    Args:
+      history: SpectrumHistory shared with other spectra
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.history = history
+    self.resamples = []
+    self._matrix = None
+    self._windows = None
+
+
+  def fft (self):
+    """Find the responses of all bands with enough history.
+
+    Args:
+      None
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    if self._matrix is None or len( self._windows) != len( self.resamples):
+      self._build()
+    count = len( self.history.levels) # none right after a reset
+    columns = self._matrix.shape[1]
+    responses = np.abs( np.dot( self._matrix[ :, columns - count:],
+                                self.history.levels.latest( count)))
+    for band, window, response in zip( self.resamples, self._windows,
+                                       responses.tolist()):
+      if window <= count:
+        band.response = response
+      else:
+        band.response = None
+
+
+  def freshen (self):
+    """nothing to release, the history only keeps what it needs."""
+    pass
+
+
+  def _build (self):
+    """build the matrix of complex exponentials for the bands
+
+    Each row covers the latest window of history for its band and is zero
+    before that.
+
+    Raises:
+      ValueError if a band needs more history than is kept
+    """
+    columns = self.history.levels.capacity
+    self._matrix = np.zeros(( len( self.resamples), columns), dtype=complex)
+    self._windows = []
+    for row, band in enumerate( self.resamples):
+      window = max( 1, int( round( MINIMUM_NUMBER_OF_CYCLES *
+                                   band.cyclePeriod / self.history.period)))
+      if window > columns:
+        raise ValueError( "Spectrum history is too short for a period of " +
+                          str( band.cyclePeriod))
+      omega = 2 * math.pi * self.history.period / band.cyclePeriod
+      self._matrix[ row, columns - window:] = np.exp(
+        -1j * omega * np.arange( window)) * BUFFER_SIZE / (
+          window * self.history.gain( 1. / band.cyclePeriod))
+      self._windows.append( window)
+
+
+#### FUNCTIONS ####
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  import time
+
+  periods = [1., 2., 3., 4., 19.2]
+  history = SpectrumHistory( MINIMUM_NUMBER_OF_CYCLES * max( periods))
+  spectrum = Spectrum( history)
+  for period in periods:
+    spectrum.resamples.append( SpectrumBand( period))
+  ticks = np.arange( 0, 120, DESIRED_PERIOD)
+  history.updateBlock( np.sin( 2 * math.pi * ticks / 3.) + 0.5 * np.sin(
+    2 * math.pi * ticks / 19.2))
+  start = time.time()
+  for _ in range( 100):
+    spectrum.fft()
+  print "fft in {0:.6f} s".format(( time.time() - start) / 100)
+  for band in spectrum.resamples:
+    print "period {0:5.1f} response {1:8.1f}".format( band.cyclePeriod,
+                                                      band.response)
+  print "expected for 1 in", BUFFER_SIZE / 2
+  history.reset() # as at a gap, before the next value
+  spectrum.fft()
+  print "after a reset:", [ band.response for band in spectrum.resamples]
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
@@ -0,0 +1,285 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+synthetic -- module for generating repeatable measurements of waves and wakes
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+The water level is a background swell, made of a few sine waves, plus boat
+wakes. A wake is a short packet of waves. The wave length is one of the
+BOAT_LENGTHS and its period comes from the deep water dispersion relation
+
+  period = sqrt( 2 * pi * waveLength / GRAVITY_CONSTANT)
+
+The level is turned into air and water column pressures the way the sensors
+would see them, with a slow drift in air pressure and some sensor noise,
+rounded to whole Pascals.
+
+Everything comes from random number generators seeded with SYNTHETIC_SEED,
+so a given seed always gives the same measurements and the same wakes, no
+matter how many measurements are asked for at a time. The wakes generated so
+far are kept in the wakes attribute for checking the wake detectors.
+"""
+
+
+#### IMPORTS ####
+
+import math
+
+import numpy as np
+
+from config import BASE_AIR_PRESSURE
+from config import SWING_AIR_PRESSURE
+from config import BASE_WATER_COLUMN_PRESSURE
+from config import BOAT_LENGTHS
+from config import DESIRED_PERIOD
+from config import GRAVITY_CONSTANT
+from config import PA_TO_INCH
+from config import WATER_COLUMN_OFFSET
+from config import SYNTHETIC_SEED
+from config import SYNTHETIC_START_TICK
+from config import SYNTHETIC_BLOCK_SIZE
+from config import SWELL_PERIODS
+from config import SWELL_HEIGHT
+from config import WAKE_INTERVAL
+from config import WAKE_HEIGHTS
+from config import WAKE_CYCLES
+from config import SENSOR_NOISE
+
+
+#### CONSTANTS ####
+
+AIR_DRIFT_PERIOD = 6 * 60 * 60 # s, period of the air pressure drift
+WAKE_SPAN = 4 # wake envelope widths on either side of the wake center
+
+
+#### CLASSES ####
+
+# pylint: disable=too-many-instance-attributes
+class SeaGenerator (object):
+  """generate measurements of a synthetic sea with boat wakes
+
+  attributes:
+    startTick: (float) epoch in s of the first measurement
+    blockSize: (int) number of measurements returned by each readBlock()
+    wakes: list of (tick, waveLength, period, height) tuples of the wakes
+      generated so far, tick being the center of the wake
+  """
+
+  def __init__ (self, seed=SYNTHETIC_SEED, startTick=SYNTHETIC_START_TICK,
+                blockSize=SYNTHETIC_BLOCK_SIZE):
+    """Initialize a generator.
+
+    Args:
+      seed: (int) optional seed for the random number generators
+      startTick: (float) optional epoch in s of the first measurement
+      blockSize: (int) optional number of measurements in each block
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.startTick = startTick
+    self.blockSize = blockSize
+    self.position = 0 # number of measurements generated so far
+    self.wakes = []
+
+    seaRandom = np.random.RandomState( seed)
+    self._wakeRandom = np.random.RandomState( seaRandom.randint( 2**31))
+    self._noiseRandom = np.random.RandomState( seaRandom.randint( 2**31))
+    self._swellFrequencies = 1. / ( np.array( SWELL_PERIODS) *
+                                    seaRandom.uniform( .95, 1.05,
+                                                       len( SWELL_PERIODS)))
+    self._swellPhases = seaRandom.uniform( 0, 2 * math.pi,
+                                           len( SWELL_PERIODS))
+    self._meanLevel = ( BASE_WATER_COLUMN_PRESSURE - BASE_AIR_PRESSURE) / \
+        PA_TO_INCH - WATER_COLUMN_OFFSET
+    self._nextWakeTick = startTick + self._wakeRandom.exponential(
+      WAKE_INTERVAL)
+
+
+  def readBlock (self):
+    """Generate the next block of measurements.
+
+    Args:
+      None
+
+    Returns:
+      ticks: (float array) epoch times of the measurements in s
+      airPressures: (int array) air pressures in Pascals
+      waterColumnPressures: (int array) water column pressures in Pascals
+
+    Raises:
+      None
+    """
+    return self.generate( self.blockSize)
+
+
+  def generate (self, count):
+    """Generate the next measurements.
+
+    Args:
+      count: (int) number of measurements
+
+    Returns:
+      ticks, airPressures, waterColumnPressures arrays
+
+    Raises:
+      None
+    """
+    indexes = np.arange( self.position, self.position + count)
+    self.position = self.position + count
+    ticks = self.startTick + indexes * DESIRED_PERIOD
+    elapsed = indexes * DESIRED_PERIOD
+
+    levels = self._meanLevel + self._swell( elapsed)
+    self._addWakes( ticks, levels)
+
+    airPressures = BASE_AIR_PRESSURE + SWING_AIR_PRESSURE / 2. * np.sin(
+      2 * math.pi * elapsed / AIR_DRIFT_PERIOD)
+    waterColumnPressures = airPressures + \
+        ( levels + WATER_COLUMN_OFFSET) * PA_TO_INCH
+    # one draw per measurement keeps the noise the same for any block sizes
+    noise = self._noiseRandom.normal( 0, SENSOR_NOISE, ( count, 2))
+    airPressures = airPressures + noise[ :, 0]
+    waterColumnPressures = waterColumnPressures + noise[ :, 1]
+    return ticks, np.round( airPressures).astype( np.int32), \
+        np.round( waterColumnPressures).astype( np.int32)
+
+
+  def close (self):
+    """nothing to close, here for the same interface as the file readers."""
+    pass
+
+
+  def _swell (self, elapsed):
+    """background swell at the elapsed times
+
+    Returns:
+      (float array) swell heights in inches
+    """
+    swell = np.zeros( len( elapsed))
+    for frequency, phase in zip( self._swellFrequencies, self._swellPhases):
+      swell = swell + SWELL_HEIGHT / 2. * np.sin(
+        2 * math.pi * frequency * elapsed + phase)
+    return swell
+
+
+  def _addWakes (self, ticks, levels):
+    """add the wakes that reach into the block of ticks to the levels
+
+    Returns:
+      None
+    """
+    # create wakes far enough ahead for any that reach back into the block
+    longest = wakePeriod( max( BOAT_LENGTHS))
+    while self._nextWakeTick < ticks[-1] + WAKE_SPAN * WAKE_CYCLES * longest:
+      waveLength = BOAT_LENGTHS[ self._wakeRandom.randint(
+        len( BOAT_LENGTHS))]
+      self.wakes.append(( self._nextWakeTick, waveLength,
+                          wakePeriod( waveLength),
+                          self._wakeRandom.uniform( *WAKE_HEIGHTS)))
+      self._nextWakeTick = self._nextWakeTick + \
+          self._wakeRandom.exponential( WAKE_INTERVAL)
+
+    reach = WAKE_SPAN * WAKE_CYCLES * longest / 2. # of the widest wake
+    for tick, _, period, height in reversed( self.wakes):
+      if tick + reach < ticks[0]:
+        break # this and all of the earlier wakes are over
+      width = WAKE_CYCLES * period / 2.
+      first, last = np.searchsorted( ticks, [ tick - WAKE_SPAN * width,
+                                              tick + WAKE_SPAN * width])
+      if first < last:
+        offsets = ticks[ first:last] - tick
+        levels[ first:last] = levels[ first:last] + height / 2. * np.exp(
+          -0.5 * ( offsets / width)**2) * np.sin( 2 * math.pi * offsets /
+                                                   period)
+
+# pylint: enable=too-many-instance-attributes
+
+
+#### FUNCTIONS ####
+
+def wakePeriod (waveLength):
+  """Period of deep water waves of a given wave length
+
+  Args:
+    waveLength: (float) wave length in ft
+
+  Returns:
+    (float) period in s
+
+  Raises:
+    None
+  """
+  return math.sqrt( 2 * math.pi * waveLength / GRAVITY_CONSTANT)
+
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  import time
+
+  start = time.time()
+  generator = SeaGenerator()
+  ticks, airPressures, waterColumnPressures = generator.generate(
+    3 * 60 * 60 * 30)
+  print "Generated 3 hours in {0:.2f} s".format( time.time() - start)
+  print ticks[:3], airPressures[:3], waterColumnPressures[:3]
+  for wake in generator.wakes:
+    print "wake at {0:.2f} length {1} period {2:.2f} height {3:.2f}".format(
+      *wake)
+
+  # the same seed gives the same measurements, a block at a time or not
+  generator = SeaGenerator()
+  blocks = [ generator.generate( 1000) for _ in range( 10)]
+  print "Repeatable:", ( np.concatenate([ block[2] for block in blocks]) ==
+                         waterColumnPressures[ :10000]).all()
+
+  # small blocks too, where long wakes reach past shorter later ones
+  differences = 0
+  for seed in range( 1, 40):
+    whole = SeaGenerator( seed).generate( 3 * 60 * 60 * 30)[2]
+    generator = SeaGenerator( seed)
+    blocks = [ generator.generate( 50) for _ in range( len( whole) // 50)]
+    differences = differences + ( np.concatenate([ block[2] for block in
+                                                   blocks]) != whole).sum()
+  print "Repeatable in blocks of 50 for seeds 1 to 39:", differences == 0
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()
@@ -0,0 +1,301 @@
+#!/usr/bin/python
+# vim: set fileencoding=utf-8
+# coding=utf8
+"""
+zoom -- module for wave responses on any grid of periods with a chirp-z
+
+Copyright (c) 2016-2018 Kirk Carlson, All Rights Reserved
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+#### NOTES ####
+
+This is the ZOOM_SPECTRUM engine. A chirp-z transform finds the spectrum at
+any number of equally spaced frequencies between any two frequencies, with
+three FFTs of a little more than the history plus the frequencies, using
+Bluestein's trick:
+
+  X[k] = sum over n of x[n] exp( -2 pi j ( start + k step) n)
+       = c[k] * sum over n of ( x[n] c[n] a[n]) / c[k - n]
+
+where c[n] = exp( -pi j step n^2) and a[n] = exp( -2 pi j start n), which is
+a convolution done with FFTs. Everything but the FFT of the values depends
+only on the lengths and frequencies, so it is worked out once and kept for
+the latest CHIRPS_KEPT grids, which always include the grid of the bands.
+
+A zoom spectrum holds bands like a spectrum.Spectrum and shares its history.
+Every time, it takes the whole history, MINIMUM_NUMBER_OF_CYCLES of the
+longest period, and finds the spectrum on a grid of ZOOM_POINTS frequencies
+that spans the bands, however many bands there are. The response of each
+band is interpolated from the grid, which is much finer than the resolution
+of the history, and scaled like the other engines. zoom() gives the
+spectrum on a grid of its own, e.g. around a peak that has been found.
+"""
+
+
+#### IMPORTS ####
+
+import collections
+import math
+
+import numpy as np
+
+from config import BUFFER_SIZE
+from config import ZOOM_POINTS
+
+
+#### CONSTANTS ####
+
+CHIRPS_KEPT = 4 # latest chirp-z transforms kept, the band grid among them
+
+
+#### CLASSES ####
+
+class ChirpZ (object):
+  """chirp-z transform for a given length, grid of frequencies
+
+  attributes:
+    length: (int) number of values transformed
+    count: (int) number of frequencies
+    start: (float) first frequency in cycles per value
+    step: (float) cycles per value between frequencies
+  """
+
+  def __init__ (self, length, count, start, step):
+    """Work out the chirps for a transform.
+
+    Args:
+      length: (int) number of values transformed
+      count: (int) number of frequencies
+      start: (float) first frequency in cycles per value
+      step: (float) cycles per value between frequencies
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.length = length
+    self.count = count
+    self.start = start
+    self.step = step
+    self._size = 2 ** int( math.ceil( math.log( length + count - 1, 2)))
+    n = np.arange( length, dtype=np.float64)
+    k = np.arange( count, dtype=np.float64)
+    self._pre = np.exp( -1j * math.pi * ( step * n * n + 2 * start * n))
+    self._post = np.exp( -1j * math.pi * step * k * k)
+    kernel = np.zeros( self._size, dtype=complex)
+    kernel[ :count] = np.exp( 1j * math.pi * step * k * k)
+    kernel[ self._size - length + 1:] = np.exp(
+      1j * math.pi * step * n[ length - 1:0:-1] ** 2)
+    self._kernel = np.fft.fft( kernel)
+
+
+  def transform (self, values):
+    """Find the spectrum of some values.
+
+    Args:
+      values: (float array) length values
+
+    Returns:
+      (complex array) spectrum at each of the count frequencies
+
+    Raises:
+      None
+    """
+    spectrum = np.fft.ifft( np.fft.fft( values * self._pre, self._size) *
+                            self._kernel)
+    return spectrum[ :self.count] * self._post
+
+
+
+class ZoomSpectrum (object):
+  """responses of a list of bands from a chirp-z of a shared history
+
+  attributes:
+    history: spectrum.SpectrumHistory of the wave heights
+    resamples: list of spectrum.SpectrumBand objects
+    points: (int) frequencies in the grid spanning the bands
+  """
+
+  def __init__ (self, history, points=ZOOM_POINTS):
+    """Initialize a spectrum with no bands.
+
+    Args:
+      history: spectrum.SpectrumHistory shared with other spectra
+      points: (int) optional frequencies in the grid spanning the bands
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    self.history = history
+    self.resamples = []
+    self.points = points
+    # ChirpZ objects by length, count, start and step, latest used last
+    self._chirps = collections.OrderedDict()
+    self._bandCount = 0
+    self._grid = None
+    self._positions = None
+    self._scales = None
+
+
+  def zoom (self, lowFrequency, highFrequency, count):
+    """Find the spectrum of the whole history on a grid of frequencies.
+
+    Args:
+      lowFrequency: (float) Hz of the first frequency
+      highFrequency: (float) Hz of the last frequency
+      count: (int) number of equally spaced frequencies
+
+    Returns:
+      frequencies: (float array) Hz of each point of the grid
+      responses: (float array) response at each frequency, scaled like the
+        other engines, or None until the history is full
+
+    Raises:
+      None
+    """
+    frequencies = np.linspace( lowFrequency, highFrequency, count)
+    length = self.history.levels.capacity
+    if len( self.history.levels) < length:
+      return frequencies, None
+    period = self.history.period
+    step = 0.
+    if count > 1:
+      step = ( highFrequency - lowFrequency) * period / ( count - 1)
+    key = ( length, count, lowFrequency * period, step)
+    chirp = self._chirps.pop( key, None)
+    if chirp is None:
+      chirp = ChirpZ( *key)
+      if len( self._chirps) >= CHIRPS_KEPT:
+        self._chirps.popitem( last=False)
+    self._chirps[ key] = chirp
+    responses = np.abs( chirp.transform(
+      self.history.levels.latest( length))) * BUFFER_SIZE / length
+    gains = np.array([ self.history.gain( frequency)
+                       for frequency in frequencies.tolist()])
+    return frequencies, responses / gains
+
+
+  def fft (self):
+    """Find the responses of all bands.
+
+    Args:
+      None
+
+    Returns:
+      None
+
+    Raises:
+      None
+    """
+    if not self.resamples:
+      return
+    if self._grid is None or self._bandCount != len( self.resamples):
+      self._build()
+    _, responses = self.zoom( self._grid[0], self._grid[-1], len( self._grid))
+    if responses is None:
+      for band in self.resamples:
+        band.response = None
+      return
+    values = np.interp( self._positions, self._grid, responses)
+    for band, value in zip( self.resamples, values.tolist()):
+      band.response = value
+
+
+  def freshen (self):
+    """nothing to release, the history only keeps what it needs."""
+    pass
+
+
+  def _build (self):
+    """lay out the grid of frequencies spanning the bands"""
+    self._positions = np.array([ 1. / band.cyclePeriod
+                                 for band in self.resamples])
+    low = self._positions.min()
+    high = self._positions.max()
+    if high == low:
+      self._grid = np.array([ low])
+    else:
+      self._grid = np.linspace( low, high, max( self.points, 2))
+    self._bandCount = len( self.resamples)
+
+
+#### FUNCTIONS ####
+
+def _test():
+  """tests the functions of this module
+
+  Args:
+    None
+
+  Returns:
+    None
+
+  Raises:
+    None
+  """
+  import time
+
+  import spectrum
+  from config import DESIRED_PERIOD
+  from config import MINIMUM_NUMBER_OF_CYCLES
+
+  values = np.random.RandomState( 1).normal( size=500)
+  chirp = ChirpZ( 500, 40, 0.01, 0.002)
+  exact = np.array([ np.dot( values, np.exp(
+    -2j * math.pi * ( 0.01 + 0.002 * k) * np.arange( 500))) for k in range( 40)])
+  print "largest error against a DFT:", np.abs(
+    chirp.transform( values) - exact).max()
+
+  periods = [1., 2., 3., 4., 19.2]
+  history = spectrum.SpectrumHistory( MINIMUM_NUMBER_OF_CYCLES * max( periods))
+  zoomSpectrum = ZoomSpectrum( history)
+  for period in periods:
+    zoomSpectrum.resamples.append( spectrum.SpectrumBand( period))
+  ticks = np.arange( 0, 120, DESIRED_PERIOD)
+  history.updateBlock( np.sin( 2 * math.pi * ticks / 3.) + 0.5 * np.sin(
+    2 * math.pi * ticks / 19.2))
+  start = time.time()
+  for _ in range( 100):
+    zoomSpectrum.fft()
+  print "fft of {0} points in {1:.6f} s".format( zoomSpectrum.points,
+                                                 ( time.time() - start) / 100)
+  for band in zoomSpectrum.resamples:
+    print "period {0:5.1f} response {1:8.1f}".format( band.cyclePeriod,
+                                                      band.response)
+  print "expected for 1 in", BUFFER_SIZE / 2
+  frequencies, responses = zoomSpectrum.zoom( 1 / 3.5, 1 / 2.5, 11)
+  for frequency, response in zip( frequencies, responses):
+    print "zoom period {0:5.2f} response {1:8.1f}".format( 1 / frequency,
+                                                           response)
+  for peak in np.linspace( 2.5, 3.5, 50): # a new grid around every peak
+    zoomSpectrum.zoom( 0.9 / peak, 1.1 / peak, 11)
+    zoomSpectrum.fft()
+  print "chirps kept after 50 zooms:", len( zoomSpectrum._chirps)
+
+
+if __name__ == "__main__":
+  # execute only if run as a script
+  _test()